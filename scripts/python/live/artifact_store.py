@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+import os
+import mmap
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+from pipeline_metrics import REGISTRY
+from pipeline_logging import get_logger
+
+logger = get_logger('artifact_store')
+
+ARTIFACT_DIR = os.getenv('ARTIFACT_DIR', 'artifacts')
+ARTIFACT_BUDGET_GB = float(os.getenv('ARTIFACT_BUDGET_GB', '20'))
+# Bytes handed to hashlib per update; large enough that the GIL is released while hashing
+HASH_CHUNK = 8 * 1024 * 1024
+
+ARTIFACT_PUTS = REGISTRY.counter(
+    'artifact_puts_total', 'Artifacts stored, by role and whether the content was already present',
+    ('role', 'result'))
+ARTIFACT_EVICTIONS = REGISTRY.counter('artifact_evictions_total', 'Artifacts evicted under the disk budget')
+ARTIFACT_BYTES = REGISTRY.gauge('artifact_store_bytes', 'Bytes held in the artifact store')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL,
+    created REAL NOT NULL, last_access REAL NOT NULL, sidecar_size INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS refs (
+    job_id TEXT NOT NULL, digest TEXT NOT NULL, role TEXT NOT NULL, created REAL NOT NULL,
+    PRIMARY KEY (job_id, digest, role));
+CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest);
+CREATE TABLE IF NOT EXISTS uploads (
+    digest TEXT NOT NULL, scope TEXT NOT NULL, video_id TEXT NOT NULL, uploaded REAL NOT NULL,
+    PRIMARY KEY (digest, scope));
+"""
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read through a memory map so large renders are never copied into Python."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, HASH_CHUNK):
+                    digest.update(view[offset:offset + HASH_CHUNK])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+class Artifact:
+    def __init__(self, digest: str, path: str, size: int, reused: bool = False):
+        self.digest = digest
+        self.path = path
+        self.size = size
+        self.reused = reused      # content was already in the store
+
+    def __repr__(self):
+        return f"Artifact({self.digest[:12]}, {self.path!r}, {self.size}B{', reused' if self.reused else ''})"
+
+class ArtifactStore:
+    """Content-addressed store for pipeline intermediates (renders, shorts, downloaded audio).
+
+    Objects live at <root>/objects/<aa>/<digest><ext> and are indexed in <root>/index.sqlite,
+    which is shared by every thread and process using the same root. Jobs hold references
+    on the objects they use; unreferenced objects are evicted least-recently-used first
+    whenever the store grows past its byte budget. Upload records outlive eviction, so a
+    render that was already published is recognised even after its file has been dropped.
+
+    Stored files are made read-only, since export() hands out hard links to them.
+    """
+
+    def __init__(self, root: str = None, budget_bytes: int = None):
+        self.root = os.path.abspath(root or ARTIFACT_DIR)
+        self.budget_bytes = budget_bytes if budget_bytes is not None else int(ARTIFACT_BUDGET_GB * 1024 ** 3)
+        self._objects_dir = os.path.join(self.root, 'objects')
+        self._tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit; writes take an explicit BEGIN IMMEDIATE so processes serialise on the index
+        self._db = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=60,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(objects)')}
+        if 'sidecar_size' not in columns:
+            # Stores created before sidecars were counted against the budget
+            self._db.execute('ALTER TABLE objects ADD COLUMN sidecar_size INTEGER NOT NULL DEFAULT 0')
+
+    @contextmanager
+    def _write(self):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def scratch_path(self, suffix: str = '') -> str:
+        """A unique path on the store's filesystem to write into before calling put()."""
+        return os.path.join(self._tmp_dir, f'{uuid.uuid4().hex}{suffix}')
+
+    def _object_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self._objects_dir, digest[:2], f'{digest}{suffix}')
+
+    # --- Storing ---
+    def put(self, path: str, job_id: str = None, role: str = 'artifact') -> Artifact:
+        """Move the file at path into the store (or drop it if identical content is already stored)."""
+        digest = hash_file(path)
+        return self._put(self._stage(path), digest, job_id, role)
+
+    def _stage(self, path: str) -> str:
+        """Bring path onto the store's filesystem, so publishing it under the index lock is a rename."""
+        if os.stat(path).st_dev == os.stat(self._tmp_dir).st_dev:
+            return path
+        staged = self.scratch_path(os.path.splitext(path)[1])
+        shutil.copy2(path, staged)
+        os.remove(path)
+        return staged
+
+    def put_bytes(self, data: bytes, suffix: str, job_id: str = None, role: str = 'artifact') -> Artifact:
+        """Store an in-memory payload; nothing is written to disk if the content is already present."""
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self._lookup(digest)
+        if existing and os.path.exists(existing):
+            try:
+                return self._put(None, digest, job_id, role)
+            except FileNotFoundError:
+                pass  # evicted since the lookup; write it after all
+        tmp_path = self.scratch_path(suffix)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self._put(tmp_path, digest, job_id, role)
+
+    def _put(self, path: Optional[str], digest: str, job_id: Optional[str], role: str) -> Artifact:
+        now = time.time()
+        with self._write() as db:
+            row = db.execute('SELECT path, size FROM objects WHERE digest = ?', (digest,)).fetchone()
+            if row and not os.path.exists(row[0]):
+                # Removed behind our back; forget it and store this copy instead
+                db.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+                row = None
+            if row:
+                stored_path, size = row
+                reused = True
+                if path and os.path.abspath(path) != stored_path:
+                    os.remove(path)
+                db.execute('UPDATE objects SET last_access = ? WHERE digest = ?', (now, digest))
+            else:
+                if path is None:
+                    raise FileNotFoundError(f"Artifact {digest} is not in the store")
+                stored_path = self._object_path(digest, os.path.splitext(path)[1])
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                # path is already on this filesystem (see _stage), so this is a rename
+                os.chmod(path, 0o444)
+                os.replace(path, stored_path)
+                size = os.path.getsize(stored_path)
+                reused = False
+                db.execute('INSERT INTO objects (digest, path, size, created, last_access) VALUES (?, ?, ?, ?, ?)',
+                           (digest, stored_path, size, now, now))
+            if job_id:
+                db.execute('INSERT OR IGNORE INTO refs (job_id, digest, role, created) VALUES (?, ?, ?, ?)',
+                           (job_id, digest, role, now))
+        ARTIFACT_PUTS.inc(role=role, result='reused' if reused else 'stored')
+        if reused:
+            logger.info(f"Reusing stored {role} {digest[:12]} ({size} bytes)")
+        else:
+            self.evict(keep=digest)
+        return Artifact(digest, stored_path, size, reused)
+
+    def _lookup(self, digest: str) -> Optional[str]:
+        row = self._query('SELECT path FROM objects WHERE digest = ?', (digest,))
+        return row[0][0] if row else None
+
+    def get(self, digest: str) -> Optional[str]:
+        """Path of a stored object, marking it recently used; None if it is not (or no longer) stored."""
+        path = self._lookup(digest)
+        if not path or not os.path.exists(path):
+            return None
+        with self._write() as db:
+            db.execute('UPDATE objects SET last_access = ? WHERE digest = ?', (time.time(), digest))
+        return path
+
+    def export(self, digest: str, dest: str) -> str:
+        """Materialise a stored object at dest, hard-linked where possible so it costs no extra space.
+
+        A link shares the stored file and is read-only like it; write to a copy instead.
+        """
+        src = self.get(digest)
+        if src is None:
+            raise FileNotFoundError(f"Artifact {digest} is not in the store")
+        tmp_path = f'{dest}.{uuid.uuid4().hex[:8]}.tmp'
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            # A copy is independent of the store, so it may be writable
+            shutil.copy2(src, tmp_path)
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, dest)
+        return dest
+
+    # --- References ---
+    def acquire(self, job_id: str, digest: str, role: str = 'artifact') -> None:
+        with self._write() as db:
+            db.execute('INSERT OR IGNORE INTO refs (job_id, digest, role, created) VALUES (?, ?, ?, ?)',
+                       (job_id, digest, role, time.time()))
+
+    def release(self, job_id: str) -> int:
+        """Drop every reference held by job_id; its objects become eligible for eviction."""
+        with self._write() as db:
+            released = db.execute('DELETE FROM refs WHERE job_id = ?', (job_id,)).rowcount
+        return released
+
+    # --- Upload Tracking ---
+    def record_upload(self, digest: str, video_id: str, scope: str = '') -> None:
+        with self._write() as db:
+            db.execute('INSERT OR REPLACE INTO uploads (digest, scope, video_id, uploaded) VALUES (?, ?, ?, ?)',
+                       (digest, scope, video_id, time.time()))
+
+    def find_upload(self, digest: str, scope: str = '') -> Optional[str]:
+        """Video ID this content was already uploaded as (per scope, e.g. channel), if any."""
+        row = self._query('SELECT video_id FROM uploads WHERE digest = ? AND scope = ?', (digest, scope))
+        return row[0][0] if row else None
+
+    def record_sidecar(self, digest: str) -> int:
+        """Count the object's analysis sidecar (see media_analysis) against the budget."""
+        path = self._lookup(digest)
+        size = _tree_size(f'{path}.analysis') if path else 0
+        with self._write() as db:
+            db.execute('UPDATE objects SET sidecar_size = ? WHERE digest = ?', (size, digest))
+        return size
+
+    # --- Eviction ---
+    def usage(self) -> int:
+        return self._query('SELECT COALESCE(SUM(size + sidecar_size), 0) FROM objects')[0][0]
+
+    def evict(self, budget_bytes: int = None, keep: str = None) -> List[str]:
+        """Evict unreferenced objects, least recently used first, until usage fits the budget."""
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        evicted = []
+        trash = []
+        # Files are renamed out of place inside the write transaction, so a concurrent put() of
+        # the same content either sees the row (and keeps the file) or sees neither. The slow
+        # part, deleting them, happens after commit.
+        with self._write() as db:
+            usage = db.execute('SELECT COALESCE(SUM(size + sidecar_size), 0) FROM objects').fetchone()[0]
+            if usage > budget:
+                candidates = db.execute(
+                    'SELECT digest, path, size + sidecar_size FROM objects '
+                    'WHERE digest NOT IN (SELECT digest FROM refs) ORDER BY last_access').fetchall()
+                for digest, path, size in candidates:
+                    if usage <= budget:
+                        break
+                    if digest == keep:
+                        continue
+                    db.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+                    # Sidecars (see media_analysis) are derived data and go with their object
+                    for victim in (path, f'{path}.analysis'):
+                        if os.path.exists(victim):
+                            doomed = self.scratch_path('.evicted')
+                            os.replace(victim, doomed)
+                            trash.append(doomed)
+                    usage -= size
+                    evicted.append(digest)
+        for doomed in trash:
+            if os.path.isdir(doomed):
+                shutil.rmtree(doomed, ignore_errors=True)
+            else:
+                os.remove(doomed)
+        ARTIFACT_BYTES.set(usage)
+        if evicted:
+            ARTIFACT_EVICTIONS.inc(len(evicted))
+            logger.info(f"Evicted {len(evicted)} artifacts; store now {usage / 1024 ** 2:.1f}MB")
+        if usage > budget:
+            logger.warning(f"Artifact store at {usage / 1024 ** 2:.1f}MB exceeds its "
+                           f"{budget / 1024 ** 2:.1f}MB budget; remaining objects are in use")
+        return evicted
+
+    def clean_scratch(self, max_age_s: float = 24 * 3600) -> int:
+        """Remove scratch files abandoned by crashed jobs."""
+        cutoff = time.time() - max_age_s
+        removed = 0
+        for name in os.listdir(self._tmp_dir):
+            path = os.path.join(self._tmp_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)     # an evicted sidecar left by an interrupted evict()
+                    else:
+                        os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        objects, usage = self._query('SELECT COUNT(*), COALESCE(SUM(size + sidecar_size), 0) FROM objects')[0]
+        pinned = self._query('SELECT COUNT(DISTINCT digest) FROM refs')[0][0]
+        uploads = self._query('SELECT COUNT(*) FROM uploads')[0][0]
+        return {'root': self.root, 'objects': objects, 'bytes': usage, 'budget_bytes': self.budget_bytes,
+                'referenced': pinned, 'uploads': uploads}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+_default_store: Optional[ArtifactStore] = None
+_default_lock = threading.Lock()
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide store rooted at ARTIFACT_DIR."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+        return _default_store
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the pipeline artifact store")
+    parser.add_argument('--root', default=ARTIFACT_DIR, help='Store directory')
+    parser.add_argument('--gc', action='store_true', help='Evict down to the budget and clear stale scratch files')
+    parser.add_argument('--budget-gb', type=float, help='Override ARTIFACT_BUDGET_GB for --gc')
+    parser.add_argument('--release', metavar='OWNER', help="Drop the references held by a job run "
+                                                          "('<trace id>:<run>', see the refs table)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store = ArtifactStore(args.root)
+    if args.release:
+        logger.info(f"Released {store.release(args.release)} references held by {args.release}")
+    if args.gc:
+        budget = int(args.budget_gb * 1024 ** 3) if args.budget_gb is not None else None
+        store.evict(budget)
+        logger.info(f"Removed {store.clean_scratch()} stale scratch files")
+    for key, value in store.stats().items():
+        logger.info(f"{key}: {value}")
+
+if __name__ == '__main__':
+    main()
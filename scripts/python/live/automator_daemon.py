@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import signal
+import argparse
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from pipeline_logging import get_logger
+
+logger = get_logger('automator_daemon')
+
+# --- Import Components ---
+from youtube_automator import RealYouTubeAutomator, build_mock_clients
+from pipeline_metrics import REGISTRY, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from stage_scheduler import (DeadlineQueue, WorkItem, PIPELINE_STAGES, get_scheduler, parse_deadline,
+                             parse_priority)
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+# --- Job Tracking ---
+class Job:
+    def __init__(self, frame_path: str, video_path: str, title: str = None, description: str = None,
+                 priority: int = 0, deadline: float = None, video_id: str = None, comment_id: str = None,
+                 comment_text: str = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.item = WorkItem(self.id, priority=priority, deadline=deadline)
+        self.frame_path = frame_path
+        self.video_path = video_path
+        self.title = title
+        self.description = description
+        # Optional per-job analytics lookup and comment reply
+        self.video_id = video_id
+        self.comment_id = comment_id
+        self.comment_text = comment_text
+        self.status = 'queued'
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id, 'status': self.status, 'frame_path': self.frame_path,
+            'video_path': self.video_path, 'submitted': self.submitted,
+            'priority': self.item.priority, 'deadline': self.item.deadline,
+            'started': self.started, 'finished': self.finished,
+            'queue_s': (self.started - self.submitted) if self.started else None,
+            'run_s': (self.finished - self.started) if self.finished and self.started else None,
+            'result': self.result, 'error': self.error,
+        }
+
+class QueueFullError(Exception):
+    pass
+
+class AutomatorService:
+    """Keeps one warm automator per worker and runs submitted jobs with bounded concurrency."""
+
+    def __init__(self, concurrency: int, max_queue: int, mock: bool = False, history: int = 1000):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.history = history
+        # Clients (OAuth services, HTTP pools, OCR engine) are built once here, not per job.
+        # googleapiclient's httplib2 transport is not thread-safe, so each worker gets its own.
+        self._automators: queue.Queue = queue.Queue()
+        for _ in range(concurrency):
+            self._automators.put(self._build_automator(mock))
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Jobs wait here rather than in the executor's FIFO, so the next free worker takes the
+        # most urgent job; stage slots inside each job are ordered by the same policy
+        self.scheduler = get_scheduler()
+        self._queue = DeadlineQueue(self.scheduler.is_urgent, {})
+        logger.info(f"Service ready with {concurrency} warm automators")
+
+    @staticmethod
+    def _build_automator(mock: bool) -> RealYouTubeAutomator:
+        return RealYouTubeAutomator(**build_mock_clients()) if mock else RealYouTubeAutomator()
+
+    def submit(self, frame_path: str, title: str = None, description: str = None,
+               video_path: str = None, priority: int = 0, deadline: float = None,
+               video_id: str = None, comment_id: str = None, comment_text: str = None) -> Job:
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue})")
+            self._pending += 1
+        job = Job(frame_path, video_path, title, description, priority, deadline,
+                  video_id, comment_id, comment_text)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queue.push(job.item, job)
+            self._prune()
+        self._executor.submit(self._run_next)
+        logger.info(f"Queued job {job.id} for '{frame_path}'")
+        return job
+
+    def _run_next(self) -> None:
+        # One call per submitted job, but it runs whichever queued job is most urgent now
+        with self._lock:
+            _, _, job = self._queue.pop()
+        self._run(job)
+
+    def _run(self, job: Job) -> None:
+        automator = self._automators.get()
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = automator.process(job.frame_path, job.video_path, trace_id=job.id,
+                                           title=job.title, description=job.description,
+                                           priority=job.item.priority, deadline=job.item.deadline,
+                                           video_id=job.video_id, comment_id=job.comment_id,
+                                           comment_text=job.comment_text)
+            # Renders are kept in the artifact store unless the client asked for a path
+            job.video_path = job.video_path or job.result.get('video_path')
+            job.status = 'succeeded'
+        except BaseException as e:
+            # SystemExit from a client must fail the job, not kill the worker thread
+            job.status = 'failed'
+            job.error = f"{type(e).__name__}: {e}"
+            logger.exception(f"Job {job.id} failed")
+        finally:
+            job.finished = time.time()
+            self._automators.put(automator)
+            with self._lock:
+                self._pending -= 1
+        logger.info(f"Job {job.id} {job.status} in {job.finished - job.started:.2f}s")
+
+    def _prune(self) -> None:
+        # Forget the oldest finished jobs once history is exceeded
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in sorted(finished, key=lambda j: j.finished)[:excess]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def schedule(self) -> dict:
+        """Stage slot usage plus every queued or running job expected to miss its deadline."""
+        at_risk = {r['id']: r for r in self.scheduler.at_risk()}
+        now = time.time()
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == 'queued']
+        # A queued job has every stage ahead of it, after roughly len(queued)/concurrency other jobs
+        per_job = sum(self.scheduler.latency.quantile(stage, 0.5) for stage in PIPELINE_STAGES)
+        backlog = len(queued) / self.concurrency * per_job
+        for job in queued:
+            eta = now + backlog + self.scheduler.expected_remaining(job.item)
+            if job.item.deadline is not None and eta > job.item.deadline:
+                at_risk[job.id] = {'id': job.id, 'priority': job.item.priority, 'deadline': job.item.deadline,
+                                   'expected_finish': eta, 'late_by_s': eta - job.item.deadline,
+                                   'remaining_stages': job.item.remaining_stages()}
+        return {**self.scheduler.snapshot(), 'queued_jobs': len(queued),
+                'at_risk': sorted(at_risk.values(), key=lambda r: -r['late_by_s'])}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# --- Job API ---
+OPTIONAL_TEXT_FIELDS = ('title', 'description', 'video_path', 'video_id', 'comment_id', 'comment_text')
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    service: AutomatorService = None
+
+    def _send(self, status: int, payload) -> None:
+        body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain' if isinstance(payload, str) else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif path == '/metrics':
+            self._send(200, REGISTRY.render_prometheus())
+        elif path == '/jobs':
+            self._send(200, self.service.list())
+        elif path == '/schedule':
+            self._send(200, self.service.schedule())
+        elif path.startswith('/jobs/'):
+            job = self.service.get(path[len('/jobs/'):])
+            if job:
+                self._send(200, job.to_dict())
+            else:
+                self._send(404, {'error': 'job not found'})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') != '/jobs':
+            self._send(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            if not body.get('frame_path'):
+                raise ValueError("'frame_path' is required")
+            for key in ('frame_path',) + OPTIONAL_TEXT_FIELDS:
+                if body.get(key) is not None and not isinstance(body[key], str):
+                    raise ValueError(f"'{key}' must be a string")
+            priority = parse_priority(body.get('priority', 0))
+            deadline = parse_deadline(body.get('deadline'))
+        except (TypeError, ValueError, OverflowError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        try:
+            job = self.service.submit(body['frame_path'], body.get('title'), body.get('description'),
+                                      body.get('video_path'), priority, deadline, body.get('video_id'),
+                                      body.get('comment_id'), body.get('comment_text'))
+        except QueueFullError as e:
+            self._send(429, {'error': str(e)})
+            return
+        self._send(202, job.to_dict())
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service: AutomatorService, host: str, port: int, socket_path: str = None):
+    JobRequestHandler.service = service
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, JobRequestHandler)
+        os.chmod(socket_path, 0o600)
+        logger.info(f"Listening on unix socket {socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), JobRequestHandler)
+        server.daemon_threads = True
+        logger.info(f"Listening on http://{host}:{server.server_address[1]}")
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Long-running YouTube automator with a local job API")
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP bind address')
+    parser.add_argument('--port', type=int, default=int(os.getenv('AUTOMATOR_PORT', '8765')), help='HTTP port')
+    parser.add_argument('--socket', default=os.getenv('AUTOMATOR_SOCKET'), help='Serve on a Unix socket instead')
+    parser.add_argument('-c', '--concurrency', type=int, default=2, help='Jobs run in parallel')
+    parser.add_argument('--max-queue', type=int, default=100, help='Queued + running jobs before 429')
+    parser.add_argument('--mock', action='store_true', help='Use mock clients')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_env()
+    # The profile is written when the daemon stops (SIGTERM / Ctrl-C)
+    with profile_session(args.profile, 'automator_daemon'):
+        try:
+            service = AutomatorService(args.concurrency, args.max_queue, args.mock)
+            server = make_server(service, args.host, args.port, args.socket)
+        except Exception:
+            logger.exception("Error starting automator_daemon")
+            sys.exit(1)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            service.shutdown()
+            if args.socket and os.path.exists(args.socket):
+                os.remove(args.socket)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import os
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+from pipeline_logging import get_logger
+
+logger = get_logger('channel_registry')
+
+# YouTube Data API units per call (see the Quota Calculator in docs/)
+QUOTA_COSTS = {
+    'videos.insert': 1600,
+    'thumbnails.set': 50,
+    'commentThreads.insert': 50,
+    'videos.list': 1,
+}
+# Quota resets at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+class QuotaExceededError(Exception):
+    pass
+
+class Channel:
+    def __init__(self, name: str, token_dir: str, client_secrets_file: str = None,
+                 daily_quota: int = 10000, concurrency: int = 1):
+        self.name = name
+        self.token_dir = token_dir
+        self.client_secrets_file = client_secrets_file
+        self.daily_quota = daily_quota
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_dict(cls, data: dict, base_dir: str = '.') -> 'Channel':
+        if not data.get('name'):
+            raise ValueError("Channel entry is missing 'name'")
+        token_dir = data.get('token_dir') or os.path.join('tokens', data['name'])
+        secrets = data.get('client_secrets_file')
+        return cls(
+            name=data['name'],
+            token_dir=os.path.join(base_dir, token_dir),
+            client_secrets_file=os.path.join(base_dir, secrets) if secrets else None,
+            daily_quota=int(data.get('daily_quota', 10000)),
+            concurrency=int(data.get('concurrency', 1)),
+        )
+
+def load_channels(path: str) -> Dict[str, Channel]:
+    """Load the channel registry; relative paths resolve against the registry file's directory."""
+    with open(path, 'r') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    channels = {}
+    for entry in config.get('channels', []):
+        channel = Channel.from_dict(entry, base_dir)
+        if channel.name in channels:
+            raise ValueError(f"Duplicate channel name in registry: {channel.name}")
+        channels[channel.name] = channel
+    return channels
+
+class QuotaLedger:
+    """Per-channel daily quota accounting, persisted in the channel's token directory.
+
+    Each channel is owned by exactly one worker process, so a thread lock is sufficient.
+    With persist=False (mock runs) the ledger lives in memory and starts from zero.
+    """
+
+    def __init__(self, channel: Channel, persist: bool = True):
+        self.channel = channel
+        self.path = os.path.join(channel.token_dir, 'quota.json') if persist else None
+        self._lock = threading.Lock()
+        self._day = None
+        self._used = 0
+        self._exhausted = False
+        self._load()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+    def _load(self) -> None:
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                self._day, self._used = data.get('day'), int(data.get('used', 0))
+                self._exhausted = bool(data.get('exhausted', False))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable quota ledger {self.path}: {e}")
+        self._roll()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if self._day != today:
+            self._day, self._used, self._exhausted = today, 0, False
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(self.channel.token_dir, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'day': self._day, 'used': self._used, 'exhausted': self._exhausted}, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            self._roll()
+            return 0 if self._exhausted else max(0, self.channel.daily_quota - self._used)
+
+    def reserve(self, operations: List[str]) -> int:
+        """Charge the cost of operations, or raise QuotaExceededError if it would overrun."""
+        cost = sum(QUOTA_COSTS[op] for op in operations)
+        with self._lock:
+            self._roll()
+            if self._exhausted or self._used + cost > self.channel.daily_quota:
+                raise QuotaExceededError(
+                    f"Channel '{self.channel.name}' has {self.channel.daily_quota - self._used} "
+                    f"units left today, needs {cost}")
+            self._used += cost
+            self._save()
+        return cost
+
+    def refund(self, operations: List[str]) -> None:
+        """Return units reserved for operations that were never called."""
+        cost = sum(QUOTA_COSTS[op] for op in operations)
+        with self._lock:
+            self._roll()
+            self._used = max(0, self._used - cost)
+            self._save()
+
+    def mark_exhausted(self) -> None:
+        """Record that the API itself reported the quota as spent for today."""
+        with self._lock:
+            self._roll()
+            self._exhausted = True
+            self._save()
+
+def _is_quota_error(e: Exception) -> bool:
+    # googleapiclient's HttpError carries the reason code in its JSON body, not its message
+    content = getattr(e, 'content', b'') or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+    return 'quotaExceeded' in content or 'quotaExceeded' in str(e)
+
+class MeteredClient:
+    """Wraps an API client so each quota-consuming method is charged at the moment it is called."""
+
+    def __init__(self, inner, ledger: QuotaLedger, operations: Dict[str, str]):
+        self._inner = inner
+        self._ledger = ledger
+        self._operations = operations  # method name -> QUOTA_COSTS key
+        self._prepaid: Counter = Counter()
+
+    def prepay(self, name: str) -> None:
+        """Reserve the quota for one call of method `name` now, ahead of the work leading up to it.
+
+        That call then uses the reservation instead of charging again; refund_unused()
+        returns it if the call never happens.
+        """
+        operation = self._operations[name]
+        self._ledger.reserve([operation])
+        self._prepaid[operation] += 1
+
+    def refund_unused(self) -> None:
+        unused = list(self._prepaid.elements())
+        self._prepaid.clear()
+        if unused:
+            self._ledger.refund(unused)
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        operation = self._operations.get(name)
+        if operation is None:
+            return attr
+
+        def call(*args, **kwargs):
+            if self._prepaid[operation]:
+                self._prepaid[operation] -= 1
+            else:
+                self._ledger.reserve([operation])
+            try:
+                return attr(*args, **kwargs)
+            except Exception as e:
+                if _is_quota_error(e):
+                    self._ledger.mark_exhausted()
+                    raise QuotaExceededError(f"Channel '{self._ledger.channel.name}' quota exhausted") from e
+                raise
+        return call
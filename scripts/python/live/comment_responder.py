@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
-import logging
 import signal
 import sys
 import argparse
 from typing import Protocol
+from pipeline_metrics import instrumented, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
 
 # --- Logging Setup ---
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
-logger.addHandler(handler)
+logger = get_logger('comment_responder')
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
-    logger.info(f'Received signal {{signum}}, shutting down...')
+    logger.info(f'Received signal {signum}, shutting down...')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, _shutdown)
@@ -30,8 +28,9 @@ class RealCommentClient:
         # TODO: initialize YouTube commentThreads API client
         pass
 
+    @instrumented('comment')
     def respond(self, comment_id: str, text: str) -> None:
-        logger.info(f"[REAL] Responding to '{{comment_id}}' with '{{text}}'")
+        logger.info(f"[REAL] Responding to '{comment_id}' with '{text}'")
         # TODO: call commentThreads.insert()
 
 class MockCommentClient:
@@ -39,7 +38,7 @@ class MockCommentClient:
         logger.info("Initializing MockCommentClient")
 
     def respond(self, comment_id: str, text: str) -> None:
-        logger.info(f"[MOCK] Pretending to respond to '{{comment_id}}' with '{{text}}'")
+        logger.info(f"[MOCK] Pretending to respond to '{comment_id}' with '{text}'")
 
 # --- Core Functionality ---
 def respond_to_comment(client: CommentClient, comment_id: str, text: str) -> None:
@@ -51,15 +50,18 @@ def main():
     parser.add_argument('-i', '--id', required=True, help='Comment ID')
     parser.add_argument('-t', '--text', required=True, help='Response text')
     parser.add_argument('--mock', action='store_true', help='Use mock Comment client')
+    add_profile_argument(parser)
     args = parser.parse_args()
+    configure_from_env()
 
     client = MockCommentClient() if args.mock else RealCommentClient()
 
-    try:
-        respond_to_comment(client, args.id, args.text)
-    except Exception:
-        logger.exception("Error in comment_responder")
-        sys.exit(1)
+    with profile_session(args.profile, 'comment_responder'):
+        try:
+            respond_to_comment(client, args.id, args.text)
+        except Exception:
+            logger.exception("Error in comment_responder")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
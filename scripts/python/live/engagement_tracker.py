@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
-import logging
 import signal
 import sys
 import argparse
 from typing import Protocol
+from pipeline_metrics import instrumented, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
 
 # --- Logging Setup ---
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
-logger.addHandler(handler)
+logger = get_logger('engagement_tracker')
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
-    logger.info(f'Received signal {{signum}}, shutting down...')
+    logger.info(f'Received signal {signum}, shutting down...')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, _shutdown)
@@ -30,8 +28,9 @@ class RealAnalyticsClient:
         # TODO: initialize YouTube Analytics API client
         pass
 
+    @instrumented('analytics')
     def fetch_metrics(self, video_id: str) -> dict:
-        logger.info(f"[REAL] Fetching metrics for '{{video_id}}'")
+        logger.info(f"[REAL] Fetching metrics for '{video_id}'")
         # TODO: call analytics API
         return {}
 
@@ -40,7 +39,7 @@ class MockAnalyticsClient:
         logger.info("Initializing MockAnalyticsClient")
 
     def fetch_metrics(self, video_id: str) -> dict:
-        logger.info(f"[MOCK] Pretending to fetch metrics for '{{video_id}}'")
+        logger.info(f"[MOCK] Pretending to fetch metrics for '{video_id}'")
         return {"views": 0, "likes": 0, "comments": 0}
 
 # --- Core Functionality ---
@@ -52,16 +51,19 @@ def main():
     parser = argparse.ArgumentParser(description="Engagement Tracker with Mock Support")
     parser.add_argument('-i', '--id', required=True, help='Video ID')
     parser.add_argument('--mock', action='store_true', help='Use mock Analytics client')
+    add_profile_argument(parser)
     args = parser.parse_args()
+    configure_from_env()
 
     client = MockAnalyticsClient() if args.mock else RealAnalyticsClient()
 
-    try:
-        metrics = fetch_metrics(client, args.id)
-        logger.info(f"Metrics: {metrics}")
-    except Exception:
-        logger.exception("Error in engagement_tracker")
-        sys.exit(1)
+    with profile_session(args.profile, 'engagement_tracker'):
+        try:
+            metrics = fetch_metrics(client, args.id)
+            logger.info(f"Metrics: {metrics}")
+        except Exception:
+            logger.exception("Error in engagement_tracker")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -2,24 +2,17 @@
 import os
 import sys
 import signal
-import logging
 import argparse
 from dotenv import load_dotenv
 from typing import Protocol, List
 from PIL import Image
 import pytesseract
+from media_analysis import load_analysis, analyze_video, keyframe_paths
+from pipeline_metrics import instrumented, record_bytes, file_size, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
 
-def setup_logging():
-    logger = logging.getLogger('frame_prompt_extractor')
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(
-        '[%(asctime)s] [%(process)d] %(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(handler)
-    return logger
-
-logger = setup_logging()
+logger = get_logger('frame_prompt_extractor')
 
 def handle_signal(signum, frame):
     logger.info(f"Received signal {signum}, exiting.")
@@ -32,19 +25,32 @@ class ExtractorClient(Protocol):
     def extract(self, frame_path: str) -> List[str]:
         ...
 
+    def extract_from_video(self, video_path: str) -> List[str]:
+        ...
+
 class RealExtractorClient:
     def __init__(self):
         load_dotenv()
 
+    @instrumented('ocr')
     def extract(self, frame_path: str) -> List[str]:
         logger.info(f"[REAL] Extracting prompts from '{frame_path}'")
         if not os.path.exists(frame_path):
             logger.error(f"Frame path does not exist: {frame_path}")
             return []
+        record_bytes('ocr', 'in', file_size(frame_path))
         text = pytesseract.image_to_string(Image.open(frame_path))
         prompts = [line for line in text.splitlines() if line.strip()]
         return prompts
 
+    def extract_from_video(self, video_path: str) -> List[str]:
+        # OCR the keyframes from the shared analysis sidecar instead of decoding the video again
+        analysis = load_analysis(video_path) or analyze_video(video_path)
+        prompts: List[str] = []
+        for keyframe in keyframe_paths(video_path, analysis):
+            prompts.extend(p for p in self.extract(keyframe) if p not in prompts)
+        return prompts
+
 class MockExtractorClient:
     def __init__(self):
         logger.info("Initializing MockExtractorClient")
@@ -53,24 +59,39 @@ class MockExtractorClient:
         logger.info(f"[MOCK] Pretending to extract prompts from '{frame_path}'")
         return ["example prompt 1", "example prompt 2"]
 
+    def extract_from_video(self, video_path: str) -> List[str]:
+        logger.info(f"[MOCK] Pretending to extract prompts from keyframes of '{video_path}'")
+        return ["example prompt 1", "example prompt 2"]
+
 def extract_prompts_from_frame(client: ExtractorClient, frame_path: str) -> List[str]:
     return client.extract(frame_path)
 
+def extract_prompts_from_video(client: ExtractorClient, video_path: str) -> List[str]:
+    return client.extract_from_video(video_path)
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Frame Prompt Extractor with Mock Support")
-    parser.add_argument('-p', '--path', required=True, help='Path to frame image')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-p', '--path', help='Path to frame image')
+    source.add_argument('-v', '--video', help='Path to video (uses its analysis sidecar keyframes)')
     parser.add_argument('--mock', action='store_true', help='Use mock Extractor client')
+    add_profile_argument(parser)
     return parser.parse_args()
 
 def main():
     args = parse_args()
+    configure_from_env()
     client = MockExtractorClient() if args.mock else RealExtractorClient()
-    try:
-        prompts = extract_prompts_from_frame(client, args.path)
-        logger.info(f"Extracted prompts: {prompts}")
-    except Exception:
-        logger.exception("Error in frame_prompt_extractor")
-        sys.exit(1)
+    with profile_session(args.profile, 'frame_prompt_extractor'):
+        try:
+            if args.video:
+                prompts = extract_prompts_from_video(client, args.video)
+            else:
+                prompts = extract_prompts_from_frame(client, args.path)
+            logger.info(f"Extracted prompts: {prompts}")
+        except Exception:
+            logger.exception("Error in frame_prompt_extractor")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
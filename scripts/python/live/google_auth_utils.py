@@ -1,17 +1,23 @@
 #!/usr/bin/env python3
 import os
 import json
-import logging
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
+from pipeline_logging import get_logger
 
-logger = logging.getLogger('google_auth')
+logger = get_logger('google_auth')
 
-def get_authenticated_service(api_name, api_version, scopes):
-    """Get an authenticated service for Google APIs using OAuth 2.0."""
+def get_authenticated_service(api_name, api_version, scopes, token_dir=None, secrets_file=None):
+    """Get an authenticated service for Google APIs using OAuth 2.0.
+
+    token_dir and secrets_file select per-channel credentials; by default tokens are
+    kept in the working directory and secrets come from GOOGLE_CLIENT_SECRETS_FILE.
+    """
     creds = None
-    token_file = f'token_{api_name}.json'
+    if token_dir:
+        os.makedirs(token_dir, exist_ok=True)
+    token_file = os.path.join(token_dir or '.', f'token_{api_name}.json')
     
     # Load credentials from file if they exist
     if os.path.exists(token_file):
@@ -28,7 +34,7 @@ def get_authenticated_service(api_name, api_version, scopes):
             creds.refresh(Request())
         else:
             logger.info("Getting new credentials")
-            secrets_file = os.getenv('GOOGLE_CLIENT_SECRETS_FILE', 'client_secrets.json')
+            secrets_file = secrets_file or os.getenv('GOOGLE_CLIENT_SECRETS_FILE', 'client_secrets.json')
             if not os.path.exists(secrets_file):
                 raise FileNotFoundError(f"Client secrets file not found: {secrets_file}")
                 
@@ -40,4 +46,5 @@ def get_authenticated_service(api_name, api_version, scopes):
             token.write(creds.to_json())
     
     from googleapiclient.discovery import build
-    return build(api_name, api_version, credentials=creds)
\ No newline at end of file
+    return build(api_name, api_version, credentials=creds,
+                 num_retries=int(os.getenv('GOOGLE_API_NUM_RETRIES', '5')))
\ No newline at end of file
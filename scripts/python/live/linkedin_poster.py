@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
-import logging
 import signal
 import sys
 import argparse
 from typing import Protocol
+from pipeline_metrics import instrumented, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
 
 # --- Logging Setup ---
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
-logger.addHandler(handler)
+logger = get_logger('linkedin_poster')
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
-    logger.info(f'Received signal {{signum}}, shutting down...')
+    logger.info(f'Received signal {signum}, shutting down...')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, _shutdown)
@@ -30,8 +28,9 @@ class RealLinkedInClient:
         # TODO: initialize LinkedIn API client
         pass
 
+    @instrumented('linkedin')
     def post_video(self, video_path: str) -> None:
-        logger.info(f"[REAL] Posting '{{video_path}}' to LinkedIn")
+        logger.info(f"[REAL] Posting '{video_path}' to LinkedIn")
         # TODO: call LinkedIn V2 API endpoint
 
 class MockLinkedInClient:
@@ -39,7 +38,7 @@ class MockLinkedInClient:
         logger.info("Initializing MockLinkedInClient")
 
     def post_video(self, video_path: str) -> None:
-        logger.info(f"[MOCK] Pretending to post '{{video_path}}' to LinkedIn")
+        logger.info(f"[MOCK] Pretending to post '{video_path}' to LinkedIn")
 
 # --- Core Functionality ---
 def post_video(client: LinkedInClient, video_path: str) -> None:
@@ -50,15 +49,18 @@ def main():
     parser = argparse.ArgumentParser(description="LinkedIn Video Poster with Mock Support")
     parser.add_argument('-p', '--path', required=True, help='Path to video file')
     parser.add_argument('--mock', action='store_true', help='Use mock LinkedIn client')
+    add_profile_argument(parser)
     args = parser.parse_args()
+    configure_from_env()
 
     client = MockLinkedInClient() if args.mock else RealLinkedInClient()
 
-    try:
-        post_video(client, args.path)
-    except Exception:
-        logger.exception("Error in linkedin_poster")
-        sys.exit(1)
+    with profile_session(args.profile, 'linkedin_poster'):
+        try:
+            post_video(client, args.path)
+        except Exception:
+            logger.exception("Error in linkedin_poster")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
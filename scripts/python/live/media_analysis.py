@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import signal
+import argparse
+import tempfile
+from typing import List, Optional, Protocol
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoFileClip
+from pipeline_metrics import instrumented, configure_from_env
+from media_worker_pool import MediaWorkerPool, get_media_pool
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
+
+logger = get_logger('media_analysis')
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+SIDECAR_VERSION = 1
+ANALYSIS_HEIGHT = int(os.getenv('ANALYSIS_HEIGHT', '480'))
+ANALYSIS_FPS = float(os.getenv('ANALYSIS_FPS', '4'))
+AUDIO_FPS = 22050
+# Mean absolute luma difference (0-255) between sampled frames that starts a new scene
+SCENE_THRESHOLD = float(os.getenv('SCENE_THRESHOLD', '28'))
+MAX_THUMBNAILS = 5
+
+def sidecar_dir(video_path: str) -> str:
+    return f"{video_path}.analysis"
+
+def _source_stamp(video_path: str) -> dict:
+    st = os.stat(video_path)
+    return {'source_size': st.st_size, 'source_mtime': st.st_mtime}
+
+def load_analysis(video_path: str) -> Optional[dict]:
+    """Return the sidecar for video_path if it exists and matches the current file, else None."""
+    path = os.path.join(sidecar_dir(video_path), 'analysis.json')
+    if not os.path.exists(path) or not os.path.exists(video_path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            analysis = json.load(f)
+    except (OSError, ValueError):
+        return None
+    stamp = _source_stamp(video_path)
+    if (analysis.get('version') != SIDECAR_VERSION
+            or analysis.get('source_size') != stamp['source_size']
+            or analysis.get('source_mtime') != stamp['source_mtime']):
+        return None
+    return analysis
+
+def sidecar_path(video_path: str, relative: str) -> str:
+    return os.path.join(sidecar_dir(video_path), relative)
+
+# --- Frame Features ---
+def _luma(frame: np.ndarray) -> np.ndarray:
+    return frame[..., 0] * 0.299 + frame[..., 1] * 0.587 + frame[..., 2] * 0.114
+
+def _sharpness(luma: np.ndarray) -> float:
+    # Variance of a discrete Laplacian: higher means more in-focus detail
+    lap = (-4 * luma[1:-1, 1:-1] + luma[:-2, 1:-1] + luma[2:, 1:-1]
+           + luma[1:-1, :-2] + luma[1:-1, 2:])
+    return float(lap.var())
+
+def _thumbnail_score(luma: np.ndarray, sharpness: float) -> float:
+    # Prefer sharp, well-exposed, contrasty frames
+    brightness = float(luma.mean())
+    exposure = 1.0 - abs(brightness - 128.0) / 128.0
+    return sharpness * (0.25 + exposure) * (1.0 + float(luma.std()) / 64.0)
+
+def _keep_best(candidates: list, best) -> list:
+    if best is None:
+        return candidates
+    return sorted(candidates + [best], key=lambda c: c[0], reverse=True)[:MAX_THUMBNAILS]
+
+# --- Analysis ---
+@instrumented('analysis')
+def analyze_video(video_path: str, force: bool = False) -> dict:
+    """Decode video_path once at reduced resolution and write the reusable sidecar."""
+    if not force:
+        cached = load_analysis(video_path)
+        if cached is not None:
+            logger.info(f"Reusing analysis sidecar for '{video_path}'")
+            return cached
+    return decode_analysis(video_path)
+
+def decode_analysis(video_path: str) -> dict:
+    """The decode pass behind analyze_video, uninstrumented so it can run in a media worker."""
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Input video not found: {video_path}")
+
+    out_dir = sidecar_dir(video_path)
+    os.makedirs(os.path.join(out_dir, 'keyframes'), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'thumbnails'), exist_ok=True)
+    logger.info(f"Analysing '{video_path}' at {ANALYSIS_HEIGHT}p / {ANALYSIS_FPS} fps")
+
+    with VideoFileClip(video_path, target_resolution=(ANALYSIS_HEIGHT, None), audio_fps=AUDIO_FPS) as clip:
+        duration = float(clip.duration or 0)
+        seconds = max(1, int(np.ceil(duration)))
+        motion_sum = np.zeros(seconds)
+        motion_n = np.zeros(seconds)
+        scenes = []
+        keyframes = []
+        # Best thumbnail candidate per finished scene, trimmed to the top few: (score, t, frame)
+        candidates = []
+        best = None
+        prev = None
+        scene_start = 0.0
+        resolution = None
+
+        for i, frame in enumerate(clip.iter_frames(fps=ANALYSIS_FPS, dtype='uint8')):
+            t = i / ANALYSIS_FPS
+            if resolution is None:
+                resolution = [int(frame.shape[1]), int(frame.shape[0])]
+            luma = _luma(frame.astype(np.float32))
+            if prev is None:
+                diff = 0.0
+            else:
+                diff = float(np.abs(luma - prev).mean())
+                sec = min(int(t), seconds - 1)
+                motion_sum[sec] += diff
+                motion_n[sec] += 1
+            prev = luma
+
+            if i == 0 or diff > SCENE_THRESHOLD:
+                if i > 0:
+                    scenes.append({'start': scene_start, 'end': t})
+                    candidates = _keep_best(candidates, best)
+                    best = None
+                scene_start = t
+                name = f"keyframes/kf_{len(keyframes):04d}.jpg"
+                Image.fromarray(frame).save(os.path.join(out_dir, name), quality=90)
+                keyframes.append({'t': t, 'scene': len(scenes), 'image': name})
+
+            score = _thumbnail_score(luma, _sharpness(luma))
+            if best is None or score > best[0]:
+                best = (score, t, frame)
+        scenes.append({'start': scene_start, 'end': duration})
+        candidates = _keep_best(candidates, best)
+
+        audio_rms = np.zeros(seconds)
+        if clip.audio is not None:
+            for sec, chunk in enumerate(clip.audio.iter_chunks(chunk_duration=1.0, fps=AUDIO_FPS)):
+                if sec >= seconds:
+                    break
+                audio_rms[sec] = float(np.sqrt(np.mean(np.square(chunk, dtype=np.float64))))
+
+    thumbnails = []
+    for rank, (score, t, frame) in enumerate(candidates):
+        name = f"thumbnails/thumb_{rank:02d}.jpg"
+        Image.fromarray(frame).save(os.path.join(out_dir, name), quality=95)
+        thumbnails.append({'t': t, 'score': score, 'image': name})
+
+    motion = np.divide(motion_sum, motion_n, out=np.zeros(seconds), where=motion_n > 0)
+    analysis = {
+        'version': SIDECAR_VERSION,
+        'source': os.path.abspath(video_path),
+        **_source_stamp(video_path),
+        'duration': duration,
+        'analysis_fps': ANALYSIS_FPS,
+        'resolution': resolution,
+        'keyframes': keyframes,
+        'scenes': scenes,
+        'per_second': [{'t': s, 'motion': float(motion[s]), 'audio_rms': float(audio_rms[s])}
+                       for s in range(seconds)],
+        'thumbnails': thumbnails,
+    }
+    # Unique temp name: two processes may analyse the same video at once
+    fd, tmp_path = tempfile.mkstemp(prefix='analysis.', suffix='.json.tmp', dir=out_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(analysis, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, 'analysis.json'))
+    logger.info(f"Analysis: {len(scenes)} scenes, {len(keyframes)} keyframes, "
+                f"{len(thumbnails)} thumbnail candidates")
+    return analysis
+
+# --- Analysis Client Protocols for Mocking ---
+class AnalysisClient(Protocol):
+    def analyze(self, video_path: str) -> dict:
+        ...
+
+class RealAnalysisClient:
+    def __init__(self, pool: MediaWorkerPool = None):
+        self.pool = pool
+
+    @instrumented('analysis')
+    def analyze(self, video_path: str) -> dict:
+        cached = load_analysis(video_path)
+        if cached is not None:
+            logger.info(f"Reusing analysis sidecar for '{video_path}'")
+            return cached
+        # Decoding holds whole frames in memory; keep it out of the long-lived parent
+        return (self.pool or get_media_pool()).run(decode_analysis, video_path)
+
+class MockAnalysisClient:
+    def __init__(self):
+        logger.info("Initializing MockAnalysisClient")
+
+    def analyze(self, video_path: str) -> dict:
+        logger.info(f"[MOCK] Pretending to analyse '{video_path}'")
+        return {
+            'version': SIDECAR_VERSION, 'source': os.path.abspath(video_path), 'duration': 0.0,
+            'keyframes': [], 'scenes': [], 'per_second': [],
+            'thumbnails': [{'t': 0.0, 'score': 0.0, 'image': 'thumbnails/thumb_00.jpg'}],
+        }
+
+# --- Sidecar Queries ---
+def best_window(analysis: dict, length: float) -> float:
+    """Start time of the most active `length`-second window, snapped to a scene start if one is close."""
+    per_second = analysis.get('per_second') or []
+    duration = analysis.get('duration', 0.0)
+    if length >= duration or not per_second:
+        return 0.0
+    motion = np.array([p['motion'] for p in per_second])
+    audio = np.array([p['audio_rms'] for p in per_second])
+    # Normalise both signals so neither dominates
+    energy = motion / (motion.max() or 1.0) + audio / (audio.max() or 1.0)
+    window = max(1, int(length))
+    sums = np.convolve(energy, np.ones(window), mode='valid')
+    start = float(np.argmax(sums)) if len(sums) else 0.0
+    for scene in analysis.get('scenes', []):
+        if abs(scene['start'] - start) <= 1.0:
+            start = scene['start']
+            break
+    return max(0.0, min(start, duration - length))
+
+def keyframe_paths(video_path: str, analysis: dict) -> List[str]:
+    return [sidecar_path(video_path, k['image']) for k in analysis.get('keyframes', [])]
+
+def thumbnail_paths(video_path: str, analysis: dict) -> List[str]:
+    return [sidecar_path(video_path, t['image']) for t in analysis.get('thumbnails', [])]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Decode a video once and write its analysis sidecar")
+    parser.add_argument('-p', '--path', required=True, help='Path to input video')
+    parser.add_argument('-f', '--force', action='store_true', help='Re-analyse even if the sidecar is current')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_env()
+    with profile_session(args.profile, 'media_analysis'):
+        try:
+            analysis = analyze_video(args.path, args.force)
+            logger.info(f"Sidecar written to {sidecar_dir(args.path)} "
+                        f"({analysis['duration']:.1f}s, {len(analysis['scenes'])} scenes)")
+        except Exception:
+            logger.exception("Error in media_analysis")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import atexit
+import signal
+import threading
+import traceback
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import Future, CancelledError
+from typing import Callable, Optional
+
+from pipeline_metrics import REGISTRY
+from pipeline_logging import get_logger
+from pipeline_profiler import is_profiling, record_worker_profile, worker_profile
+
+logger = get_logger('media_worker_pool')
+
+MEDIA_WORKERS = int(os.getenv('MEDIA_WORKERS', str(max(1, (os.cpu_count() or 1) // 2))))
+# Recycle a worker after this many jobs, even if it looks healthy
+MEDIA_WORKER_MAX_JOBS = int(os.getenv('MEDIA_WORKER_MAX_JOBS', '20'))
+# Resident memory of a worker plus its ffmpeg children; a job that exceeds it is killed
+MEDIA_WORKER_MAX_RSS_MB = float(os.getenv('MEDIA_WORKER_MAX_RSS_MB', '2048'))
+MEDIA_JOB_TIMEOUT_S = float(os.getenv('MEDIA_JOB_TIMEOUT_S', '1800'))
+MONITOR_INTERVAL_S = 1.0
+
+MEDIA_JOBS = REGISTRY.counter('media_jobs_total', 'Media worker jobs by outcome', ('result',))
+MEDIA_RECYCLES = REGISTRY.counter('media_worker_recycles_total', 'Media worker restarts by reason', ('reason',))
+MEDIA_WORKER_RSS = REGISTRY.gauge('media_worker_rss_bytes', 'Resident memory of each busy media worker group',
+                                  ('worker',))
+
+class MemoryLimitExceeded(MemoryError):
+    pass
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def group_rss(pgid: int) -> Optional[int]:
+    """Total resident bytes of every process in a process group (Linux /proc only)."""
+    if not os.path.isdir('/proc'):
+        return None
+    total = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the parenthesised command name: state, ppid, pgrp, ... rss is the 22nd
+        fields = stat[stat.rfind(b')') + 2:].split()
+        if len(fields) > 21 and int(fields[2]) == pgid:
+            total += int(fields[21]) * _PAGE_SIZE
+    return total
+
+def _kill_group(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+# --- Worker Process ---
+def _worker_main(conn) -> None:
+    # Own process group: cancelling a job kills this worker and its ffmpeg children only
+    os.setpgrp()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # the parent decides when workers stop
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args, kwargs, profile = task
+        with worker_profile(profile) as usage:
+            try:
+                reply = ('ok', fn(*args, **kwargs), '')
+            except BaseException as e:
+                reply = ('error', e, traceback.format_exc())
+        try:
+            conn.send(reply + (usage,))
+        except Exception as e:
+            # Unpicklable result or exception
+            conn.send(('error', RuntimeError(f"{type(e).__name__}: {e}"), '', usage))
+
+class _Job:
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.cancel_requested = False
+        # Sampled at submit time: the caller's --profile session, if any, gets the worker's usage
+        self.profile = is_profiling()
+        self.usage: Optional[dict] = None
+
+class _WorkerSlot:
+    """One parent thread owning one worker process, restarted on crash, breach or recycle."""
+
+    def __init__(self, pool: 'MediaWorkerPool', index: int):
+        self.pool = pool
+        self.name = f'media-{index}'
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+        self.jobs_done = 0
+        self.current: Optional[_Job] = None
+        self.thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self.thread.start()
+
+    def _spawn(self) -> None:
+        parent_conn, child_conn = self.pool.context.Pipe()
+        self.process = self.pool.context.Process(target=_worker_main, args=(child_conn,), name=self.name,
+                                                 daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs_done = 0
+
+    def stop(self, reason: str = None, graceful: bool = True) -> None:
+        if self.process is None:
+            return
+        if graceful and self.process.is_alive():
+            try:
+                self.conn.send(None)
+                self.process.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+        # The worker leads its own group; this also reaps any ffmpeg it left behind
+        _kill_group(self.process.pid)
+        self.process.join(timeout=5)
+        self.conn.close()
+        self.process = None
+        MEDIA_WORKER_RSS.set(0, worker=self.name)
+        if reason:
+            MEDIA_RECYCLES.inc(reason=reason)
+
+    def kill_current(self) -> None:
+        if self.process is not None:
+            _kill_group(self.process.pid)
+
+    def _loop(self) -> None:
+        while True:
+            job = self.pool._jobs.get()
+            if job is None:
+                self.stop()
+                return
+            # Published before the closed check, so shutdown() either sees it or we see closed
+            self.current = job
+            try:
+                if self.pool._closed:
+                    job.future.cancel()
+                    MEDIA_JOBS.inc(result='cancelled')
+                    continue
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                self._run(job)
+            finally:
+                self.current = None
+
+    def _fail(self, job: _Job, failure: BaseException, reason: str) -> None:
+        logger.warning(f"{self.name}: {job.fn.__name__} stopped ({reason}) {failure}".rstrip())
+        self.stop(reason, graceful=False)
+        MEDIA_JOBS.inc(result=reason)
+        job.future.set_exception(failure)
+
+    def _run(self, job: _Job) -> None:
+        if self.process is None or not self.process.is_alive():
+            self._spawn()
+        try:
+            self.conn.send((job.fn, job.args, job.kwargs, job.profile))
+        except Exception as e:
+            MEDIA_JOBS.inc(result='error')
+            job.future.set_exception(e)
+            return
+        limit = self.pool.memory_limit_bytes
+        deadline = time.monotonic() + self.pool.timeout_s if self.pool.timeout_s else None
+        while not self.conn.poll(MONITOR_INTERVAL_S):
+            failure = None
+            rss = group_rss(self.process.pid)
+            if rss is not None:
+                MEDIA_WORKER_RSS.set(rss, worker=self.name)
+            if job.cancel_requested:
+                failure, reason = CancelledError(), 'cancelled'
+            elif deadline and time.monotonic() > deadline:
+                failure, reason = TimeoutError(f"Media job exceeded {self.pool.timeout_s:.0f}s"), 'timeout'
+            elif limit and rss is not None and rss > limit:
+                failure, reason = MemoryLimitExceeded(
+                    f"Media job used {rss / 1024 ** 2:.0f}MB, limit is {limit / 1024 ** 2:.0f}MB"), 'memory'
+            elif not self.process.is_alive():
+                failure, reason = WorkerCrashed(f"Media worker exited with code {self.process.exitcode}"), 'crash'
+            if failure is not None:
+                self._fail(job, failure, reason)
+                return
+        try:
+            status, payload, tb, job.usage = self.conn.recv()
+        except (EOFError, OSError) as e:
+            # A cancel kills the worker directly, which surfaces here as a closed pipe
+            if job.cancel_requested:
+                self._fail(job, CancelledError(), 'cancelled')
+            else:
+                self._fail(job, WorkerCrashed(f"Media worker died: {e!r}"), 'crash')
+            return
+        self.jobs_done += 1
+        if status == 'ok':
+            MEDIA_JOBS.inc(result='ok')
+            job.future.set_result(payload)
+        else:
+            MEDIA_JOBS.inc(result='error')
+            logger.debug(f"{self.name}: {job.fn.__name__} failed in worker:\n{tb}")
+            job.future.set_exception(payload)
+
+        # Recycle between jobs so the next one starts from a clean process
+        rss = group_rss(self.process.pid)
+        if job.cancel_requested:
+            # cancel() raced the reply and may already have killed the worker
+            self.stop('cancelled', graceful=False)
+        elif self.jobs_done >= self.pool.max_jobs:
+            self.stop('max_jobs')
+        elif limit and rss is not None and rss > limit * 0.8:
+            logger.info(f"{self.name}: recycling at {rss / 1024 ** 2:.0f}MB resident")
+            self.stop('memory')
+
+class MediaJob:
+    def __init__(self, job: _Job, pool: 'MediaWorkerPool'):
+        self._job = job
+        self._pool = pool
+
+    def result(self, timeout: float = None):
+        try:
+            return self._job.future.result(timeout)
+        finally:
+            # Recorded here, in the caller's thread, so it lands under the caller's stage
+            if self._job.usage:
+                record_worker_profile(self._job.usage)
+                self._job.usage = None
+
+    def cancel(self) -> bool:
+        """Cancel a queued job, or kill the worker (and only its children) running it."""
+        if self._job.future.cancel():
+            return True
+        if self._job.future.done():
+            return False
+        self._job.cancel_requested = True
+        for slot in self._pool._slots:
+            if slot.current is self._job:
+                slot.kill_current()
+        return True
+
+class MediaWorkerPool:
+    """Process pool for CPU-heavy media work with per-worker memory ceilings and recycling.
+
+    Each worker runs in its own process group so a cancelled, timed-out or oversized job is
+    stopped by killing that group alone. Workers are spawned lazily and replaced after
+    `max_jobs` jobs, after a crash, or when their resident memory nears the ceiling.
+    """
+
+    def __init__(self, workers: int = None, max_jobs: int = None, memory_limit_mb: float = None,
+                 timeout_s: float = None):
+        self.workers = workers if workers is not None else MEDIA_WORKERS
+        self.max_jobs = max_jobs or MEDIA_WORKER_MAX_JOBS
+        limit_mb = MEDIA_WORKER_MAX_RSS_MB if memory_limit_mb is None else memory_limit_mb
+        self.memory_limit_bytes = int(limit_mb * 1024 ** 2)
+        self.timeout_s = MEDIA_JOB_TIMEOUT_S if timeout_s is None else timeout_s
+        # spawn: workers must not inherit the parent's threads, locks or open clips
+        self.context = multiprocessing.get_context('spawn')
+        self._jobs: queue.Queue = queue.Queue()
+        self._slots = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn: Callable, *args, **kwargs) -> MediaJob:
+        """Queue fn(*args, **kwargs) for a worker; fn must be importable (module-level)."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Media worker pool is shut down")
+            if not self._slots:
+                self._slots = [_WorkerSlot(self, i) for i in range(self.workers)]
+        job = _Job(fn, args, kwargs)
+        self._jobs.put(job)
+        return MediaJob(job, self)
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Run fn in a worker and wait for its result; runs inline when the pool has no workers."""
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+        job = self.submit(fn, *args, **kwargs)
+        try:
+            return job.result()
+        except BaseException:
+            # Interrupted while waiting: don't leave the job running unattended
+            job.cancel()
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            slots = self._slots
+        # Queued jobs would otherwise start fresh workers while we are trying to stop
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.future.cancel()
+                MEDIA_JOBS.inc(result='cancelled')
+        for slot in slots:
+            job = slot.current
+            # A finished job's worker is stopped gracefully below
+            if job is not None and not job.future.done():
+                job.cancel_requested = True
+                slot.kill_current()
+        for _ in slots:
+            self._jobs.put(None)
+        for slot in slots:
+            slot.thread.join(timeout=10)
+
+_default_pool: Optional[MediaWorkerPool] = None
+_default_lock = threading.Lock()
+
+_default_workers: Optional[int] = None
+
+def configure_media_pool(workers: int) -> None:
+    """Set the size of this process's pool before first use (multi_channel_runner splits it across shards)."""
+    global _default_workers
+    with _default_lock:
+        if _default_pool is not None:
+            raise RuntimeError("Media worker pool already started")
+        _default_workers = workers
+
+def get_media_pool() -> MediaWorkerPool:
+    """Process-wide pool shared by shorts rendering and media analysis."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = MediaWorkerPool(_default_workers)
+            # Registered after multiprocessing's own exit hook (imported above), so it runs
+            # first and workers stop cleanly instead of being sent SIGTERM
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
+
+def shutdown_media_pool() -> None:
+    with _default_lock:
+        pool = _default_pool
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import uuid
+import queue
+import signal
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, List
+from pipeline_logging import get_logger, log_context
+
+logger = get_logger('multi_channel_runner')
+
+# --- Import Components ---
+from youtube_automator import RealYouTubeAutomator, build_mock_clients
+from youtube_uploader import RealYouTubeClient
+from comment_responder import RealCommentClient
+from thumbnail_uploader import RealThumbnailClient
+from stage_scheduler import DeadlineQueue, WorkItem, get_scheduler, parse_deadline, parse_priority
+from channel_registry import Channel, QuotaLedger, MeteredClient, QuotaExceededError, load_channels
+from pipeline_metrics import configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from media_worker_pool import MEDIA_WORKERS, MEDIA_WORKER_MAX_RSS_MB, configure_media_pool
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+# --- Per-Channel Execution (runs inside a shard process) ---
+class ChannelWorker:
+    def __init__(self, channel: Channel, mock: bool):
+        self.channel = channel
+        # Mock runs still meter quota, but never touch a real channel's ledger file
+        self.ledger = QuotaLedger(channel, persist=not mock)
+        self._automators: queue.Queue = queue.Queue()
+        # Jobs are picked most-urgent-first when a thread frees up, not in file order
+        self._pending = DeadlineQueue(get_scheduler().is_urgent, {})
+        self._pending_lock = threading.Lock()
+        for _ in range(channel.concurrency):
+            self._automators.put(self._build_automator(mock))
+
+    def _build_automator(self, mock: bool) -> RealYouTubeAutomator:
+        clients = build_mock_clients() if mock else {
+            'uploader': RealYouTubeClient(self.channel.token_dir, self.channel.client_secrets_file),
+            'commenter': RealCommentClient(),
+            'thumbnails': RealThumbnailClient(self.channel.token_dir, self.channel.client_secrets_file),
+        }
+        clients['uploader'] = MeteredClient(clients['uploader'], self.ledger, {'upload': 'videos.insert'})
+        clients['commenter'] = MeteredClient(clients['commenter'], self.ledger,
+                                             {'respond': 'commentThreads.insert'})
+        clients['thumbnails'] = MeteredClient(clients['thumbnails'], self.ledger,
+                                              {'upload_thumbnail': 'thumbnails.set'})
+        return RealYouTubeAutomator(**clients, channel=self.channel.name)
+
+    def enqueue(self, job: dict) -> None:
+        item = WorkItem(job['id'], self.channel.name, job.get('priority', 0), job.get('deadline'))
+        with self._pending_lock:
+            self._pending.push(item, job)
+
+    def run_next(self) -> dict:
+        with self._pending_lock:
+            _, _, job = self._pending.pop()
+        return self.run_job(job)
+
+    def run_job(self, job: dict) -> dict:
+        with log_context(channel=self.channel.name):
+            return self._run_job(job)
+
+    def _run_job(self, job: dict) -> dict:
+        result = {'channel': self.channel.name, 'id': job['id'], 'frame_path': job['frame_path']}
+        automator = self._automators.get()
+        try:
+            try:
+                # Hold the upload's units before spending Runway time on the item, so concurrent
+                # jobs cannot all pass a check and then fail at upload
+                automator.uploader.prepay('upload')
+            except QuotaExceededError:
+                result['status'] = 'skipped_quota'
+                return result
+            result.update(automator.process(job['frame_path'], job.get('video_path'), trace_id=job['id'],
+                                            title=job.get('title'), description=job.get('description'),
+                                            priority=job.get('priority', 0), deadline=job.get('deadline'),
+                                            video_id=job.get('video_id'), comment_id=job.get('comment_id'),
+                                            comment_text=job.get('comment_text')))
+            result['status'] = 'succeeded'
+        except QuotaExceededError as e:
+            logger.warning(str(e))
+            result.update(status='quota_exhausted', error=str(e))
+        except BaseException as e:
+            # Clients call sys.exit on fatal errors; keep that scoped to this job
+            logger.exception(f"Job {job['id']} on channel '{self.channel.name}' failed")
+            result.update(status='failed', error=f"{type(e).__name__}: {e}")
+        finally:
+            # The upload never happened (failure, or a render already uploaded): give it back
+            automator.uploader.refund_unused()
+            self._automators.put(automator)
+        return result
+
+def run_shard(channels: List[Channel], jobs_by_channel: Dict[str, List[dict]], mock: bool,
+              media_workers: int) -> List[dict]:
+    """Run every job for the given channels; each channel gets its own credentials and thread pool."""
+    configure_from_env()
+    configure_media_pool(media_workers)
+    results: List[dict] = []
+    executors = []
+    futures = []
+    for channel in channels:
+        jobs = jobs_by_channel.get(channel.name, [])
+        try:
+            worker = ChannelWorker(channel, mock)
+        except BaseException as e:
+            logger.exception(f"Could not start channel '{channel.name}'")
+            results.extend({'channel': channel.name, 'id': j['id'], 'frame_path': j['frame_path'],
+                            'status': 'failed', 'error': f"{type(e).__name__}: {e}"} for j in jobs)
+            continue
+        executor = ThreadPoolExecutor(max_workers=channel.concurrency, thread_name_prefix=channel.name)
+        executors.append(executor)
+        for job in jobs:
+            worker.enqueue(job)
+        futures.extend(executor.submit(worker.run_next) for _ in jobs)
+    results.extend(f.result() for f in futures)
+    for executor in executors:
+        executor.shutdown()
+    return results
+
+# --- Sharding ---
+def assign_shards(channels: List[Channel], jobs_by_channel: Dict[str, List[dict]],
+                  workers: int) -> List[List[Channel]]:
+    """Greedy longest-processing-time packing of channels onto worker processes."""
+    shards: List[List[Channel]] = [[] for _ in range(max(1, min(workers, len(channels))))]
+    load = [0.0] * len(shards)
+    weight = lambda c: len(jobs_by_channel.get(c.name, [])) / max(1, c.concurrency)
+    for channel in sorted(channels, key=weight, reverse=True):
+        target = load.index(min(load))
+        shards[target].append(channel)
+        load[target] += weight(channel)
+    return [s for s in shards if s]
+
+def load_jobs(path: str, channels: Dict[str, Channel]) -> Dict[str, List[dict]]:
+    jobs_by_channel: Dict[str, List[dict]] = {}
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            if job.get('channel') not in channels:
+                raise ValueError(f"{path}:{line_no}: unknown channel {job.get('channel')!r}")
+            if not job.get('frame_path'):
+                raise ValueError(f"{path}:{line_no}: 'frame_path' is required")
+            job.setdefault('id', uuid.uuid4().hex[:16])
+            try:
+                job['priority'] = parse_priority(job.get('priority', 0))
+                job['deadline'] = parse_deadline(job.get('deadline'))
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"{path}:{line_no}: bad priority or deadline: {e}")
+            jobs_by_channel.setdefault(job['channel'], []).append(job)
+    return jobs_by_channel
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run pipeline jobs across many channels in sharded processes")
+    parser.add_argument('-c', '--channels', default='configs/channels.json', help='Channel registry JSON')
+    parser.add_argument('-j', '--jobs', required=True, help='JSONL file of {"channel", "frame_path", ...} jobs')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('-o', '--output', help='Write per-job results as JSON')
+    parser.add_argument('--mock', action='store_true', help='Use mock clients')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_env()
+    with profile_session(args.profile, 'multi_channel_runner'):
+        try:
+            channels = load_channels(args.channels)
+            jobs_by_channel = load_jobs(args.jobs, channels)
+            active = [c for c in channels.values() if c.name in jobs_by_channel]
+            shards = assign_shards(active, jobs_by_channel, args.workers)
+            logger.info(f"Running {sum(map(len, jobs_by_channel.values()))} jobs for {len(active)} "
+                        f"channels on {len(shards)} worker processes")
+            # Every shard has its own media pool: split the workers so the host total stays MEDIA_WORKERS
+            media_workers = MEDIA_WORKERS and max(1, MEDIA_WORKERS // max(1, len(shards)))
+            if media_workers:
+                logger.info(f"Media workers: {media_workers} per shard, up to "
+                            f"{len(shards) * media_workers * MEDIA_WORKER_MAX_RSS_MB:.0f}MB resident in total")
+
+            results: List[dict] = []
+            # spawn: shard processes must not inherit the parent's threads or locks
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(shards) or 1, mp_context=context) as pool:
+                futures = [pool.submit(run_shard, shard, {c.name: jobs_by_channel[c.name] for c in shard},
+                                       args.mock, media_workers) for shard in shards]
+                for future in futures:
+                    results.extend(future.result())
+
+            for channel in active:
+                statuses: Dict[str, int] = {}
+                for r in results:
+                    if r['channel'] == channel.name:
+                        statuses[r['status']] = statuses.get(r['status'], 0) + 1
+                quota = '' if args.mock else f" ({QuotaLedger(channel).remaining} quota units left today)"
+                logger.info(f"Channel '{channel.name}': {statuses}{quota}")
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump(results, f, indent=2)
+        except Exception:
+            logger.exception("Error in multi_channel_runner")
+            sys.exit(1)
+    if any(r['status'] == 'failed' for r in results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
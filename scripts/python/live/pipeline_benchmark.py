@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import math
+import time
+import signal
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
+
+logger = get_logger('pipeline_benchmark')
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+# --- Import Components ---
+import frame_prompt_extractor
+import runway_video_generator
+import youtube_uploader
+import engagement_tracker
+import shorts_generator
+import linkedin_poster
+import comment_responder
+import media_analysis
+import thumbnail_uploader
+from youtube_automator import RealYouTubeAutomator
+from artifact_store import ArtifactStore
+from stage_scheduler import StageScheduler
+
+STAGE_MODULES = {
+    'extract': frame_prompt_extractor,
+    'runway': runway_video_generator,
+    'upload': youtube_uploader,
+    'analytics': engagement_tracker,
+    'shorts': shorts_generator,
+    'linkedin': linkedin_poster,
+    'comment': comment_responder,
+    'analysis': media_analysis,
+    'thumbnail': thumbnail_uploader,
+}
+
+# --- Load Model ---
+@dataclass
+class StageProfile:
+    distribution: str = 'fixed'   # fixed | uniform | normal | lognormal | exponential
+    mean_ms: float = 0.0
+    stddev_ms: float = 0.0
+    error_rate: float = 0.0
+    payload_bytes: int = 0        # synthetic media size for runway/shorts output
+
+    def sample_latency(self, rng: random.Random) -> float:
+        mean, sd = self.mean_ms, self.stddev_ms
+        if self.distribution == 'uniform':
+            ms = rng.uniform(max(0.0, mean - sd), mean + sd)
+        elif self.distribution == 'normal':
+            ms = rng.gauss(mean, sd)
+        elif self.distribution == 'lognormal':
+            ms = rng.lognormvariate(*_lognormal_params(mean, sd)) if mean > 0 else 0.0
+        elif self.distribution == 'exponential':
+            ms = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            ms = mean
+        return max(0.0, ms) / 1000.0
+
+def _lognormal_params(mean: float, sd: float):
+    # Convert the desired mean/stddev of the sample into mu/sigma of the underlying normal
+    sigma2 = math.log(1 + (sd * sd) / (mean * mean))
+    return math.log(mean) - sigma2 / 2, math.sqrt(sigma2)
+
+class SimulatedStageError(RuntimeError):
+    pass
+
+class StageRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, stage: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(stage, []).append(seconds)
+            if failed:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    'count': len(values),
+                    'errors': self.errors.get(stage, 0),
+                    'p50_ms': percentile(values, 50) * 1000,
+                    'p95_ms': percentile(values, 95) * 1000,
+                    'p99_ms': percentile(values, 99) * 1000,
+                }
+                for stage, values in sorted(self.latencies.items())
+            }
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class SimulatedClient:
+    """Wraps a Mock*Client, adding latency, injected failures and synthetic payloads."""
+
+    def __init__(self, stage: str, inner, profile: StageProfile, recorder: StageRecorder,
+                 rng: random.Random, work_dir: str):
+        self._stage = stage
+        self._inner = inner
+        self._profile = profile
+        self._recorder = recorder
+        self._rng = rng
+        self._work_dir = work_dir
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+        if asyncio.iscoroutinefunction(attr):
+            async def async_call(*args, **kwargs):
+                start = time.perf_counter()
+                delay, fail = self._draw()
+                try:
+                    await asyncio.sleep(delay)
+                    if fail:
+                        raise SimulatedStageError(f"Injected failure in stage '{self._stage}'")
+                    return self._synthesize(await attr(*args, **kwargs))
+                finally:
+                    self._recorder.record(self._stage, time.perf_counter() - start, fail)
+            return async_call
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            delay, fail = self._draw()
+            try:
+                time.sleep(delay)
+                if fail:
+                    raise SimulatedStageError(f"Injected failure in stage '{self._stage}'")
+                return self._synthesize(attr(*args, **kwargs))
+            finally:
+                self._recorder.record(self._stage, time.perf_counter() - start, fail)
+        return call
+
+    def _draw(self):
+        return self._profile.sample_latency(self._rng), self._rng.random() < self._profile.error_rate
+
+    def _synthesize(self, result):
+        size = self._profile.payload_bytes
+        if not size:
+            return result
+        if isinstance(result, bytes):
+            # Distinct renders, so the artifact store neither de-duplicates nor skips uploads
+            return os.urandom(min(16, size)) + bytes(max(0, size - 16))
+        if isinstance(result, str) and self._stage == 'shorts':
+            fd, path = tempfile.mkstemp(prefix='short_', suffix='.mp4', dir=self._work_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(min(16, size)))
+                f.truncate(size)
+            return path
+        return result
+
+# --- Benchmark Driver ---
+def load_profiles(config_path: str, defaults: StageProfile) -> Dict[str, StageProfile]:
+    profiles = {stage: StageProfile(**asdict(defaults)) for stage in STAGE_MODULES}
+    if config_path:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        for stage, overrides in config.get('stages', {}).items():
+            if stage not in profiles:
+                raise ValueError(f"Unknown stage in benchmark config: {stage}")
+            profiles[stage] = StageProfile(**{**asdict(profiles[stage]), **overrides})
+    return profiles
+
+def build_automator(profiles: Dict[str, StageProfile], recorder: StageRecorder,
+                    rng: random.Random, work_dir: str, store: ArtifactStore) -> RealYouTubeAutomator:
+    mocks = {
+        'extract': frame_prompt_extractor.MockExtractorClient(),
+        'runway': runway_video_generator.MockRunwayClient(),
+        'upload': youtube_uploader.MockYouTubeClient(),
+        'analytics': engagement_tracker.MockAnalyticsClient(),
+        'shorts': shorts_generator.MockShortsClient(),
+        'linkedin': linkedin_poster.MockLinkedInClient(),
+        'comment': comment_responder.MockCommentClient(),
+        'analysis': media_analysis.MockAnalysisClient(),
+        'thumbnail': thumbnail_uploader.MockThumbnailClient(),
+    }
+    clients = {stage: SimulatedClient(stage, mock, profiles[stage], recorder, rng, work_dir)
+               for stage, mock in mocks.items()}
+    automator = RealYouTubeAutomator(
+        extractor=clients['extract'], runway=clients['runway'], uploader=clients['upload'],
+        analytics=clients['analytics'], shorts=clients['shorts'],
+        linkedin=clients['linkedin'], commenter=clients['comment'],
+        analyzer=clients['analysis'], thumbnails=clients['thumbnail'], store=store,
+        scheduler=StageScheduler())
+    return automator
+
+def run_batch(batch_size: int, concurrency: int, profiles: Dict[str, StageProfile],
+              seed: int) -> dict:
+    recorder = StageRecorder()
+    rng = random.Random(seed)
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix='pipeline_bench_') as work_dir:
+        # Unbounded budget: eviction cost is not part of what this measures
+        store = ArtifactStore(os.path.join(work_dir, 'artifacts'), budget_bytes=2 ** 62)
+        automator = build_automator(profiles, recorder, rng, work_dir, store)
+
+        def process(index: int) -> bool:
+            try:
+                # Exercise the optional analytics and comment stages as well
+                automator.process('bench_frame.png', video_id='bench_video', comment_id='bench_comment')
+                return True
+            except SimulatedStageError:
+                return False
+
+        # Share tracemalloc with --profile rather than stopping it under the profiler
+        already_tracing = tracemalloc.is_tracing()
+        if already_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for ok in pool.map(process, range(batch_size)):
+                failures += 0 if ok else 1
+        wall = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+        store.close()
+
+    completed = batch_size - failures
+    return {
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'completed': completed,
+        'failed': failures,
+        'wall_s': wall,
+        'items_per_s': completed / wall if wall > 0 else 0.0,
+        'peak_traced_mb': peak / (1024 * 1024),
+        # High-water mark of the whole process so far, not just this batch (KB on Linux)
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': recorder.summary(),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def print_report(results: List[dict], baseline: dict = None) -> None:
+    base = {r['batch_size']: r for r in (baseline or {}).get('results', [])}
+    for r in results:
+        line = (f"batch={r['batch_size']:>5} ok={r['completed']:>5} failed={r['failed']:>4} "
+                f"{r['items_per_s']:8.2f} items/s  python heap peak={r['peak_traced_mb']:.1f}MB "
+                f"max RSS={r['max_rss_mb']:.1f}MB")
+        prev = base.get(r['batch_size'])
+        if prev and prev['items_per_s']:
+            delta = (r['items_per_s'] - prev['items_per_s']) / prev['items_per_s'] * 100
+            line += f"  ({delta:+.1f}% vs {baseline.get('commit', 'baseline')})"
+        logger.info(line)
+        for stage, s in r['stages'].items():
+            logger.info(f"    {stage:<10} n={s['count']:>5} err={s['errors']:>4} "
+                        f"p50={s['p50_ms']:8.1f}ms p95={s['p95_ms']:8.1f}ms p99={s['p99_ms']:8.1f}ms")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline pipeline throughput benchmark on mock clients")
+    parser.add_argument('-b', '--batch-sizes', default='1,10,50', help='Comma-separated batch sizes')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='Items processed in parallel')
+    parser.add_argument('--config', help='JSON file with per-stage latency/error/payload profiles')
+    parser.add_argument('--distribution', default='lognormal', help='Default latency distribution')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Default mean stage latency')
+    parser.add_argument('--stddev-ms', type=float, default=10.0, help='Default stage latency stddev')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Default per-call failure rate')
+    parser.add_argument('--media-mb', type=float, default=1.0, help='Synthetic render/short size in MB')
+    parser.add_argument('--seed', type=int, default=1234, help='Random seed')
+    parser.add_argument('-o', '--output', help='Results file (default: bench_results/<commit>.json)')
+    parser.add_argument('--baseline', help='Previous results file to compare against')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Keep per-call mock client logging')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if not args.verbose:
+        for module in STAGE_MODULES.values():
+            module.logger.setLevel(logging.WARNING)
+        logging.getLogger('youtube_automator').setLevel(logging.WARNING)
+
+    defaults = StageProfile(distribution=args.distribution, mean_ms=args.latency_ms,
+                            stddev_ms=args.stddev_ms, error_rate=args.error_rate)
+    with profile_session(args.profile, 'pipeline_benchmark'):
+        try:
+            profiles = load_profiles(args.config, defaults)
+            media_bytes = int(args.media_mb * 1024 * 1024)
+            for stage in ('runway', 'shorts'):
+                if not profiles[stage].payload_bytes:
+                    profiles[stage].payload_bytes = media_bytes
+
+            results = []
+            for batch_size in (int(b) for b in args.batch_sizes.split(',') if b.strip()):
+                logger.info(f"Running batch of {batch_size} items (concurrency {args.concurrency})")
+                results.append(run_batch(batch_size, args.concurrency, profiles, args.seed))
+
+            commit = git_commit()
+            report = {
+                'commit': commit,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'host': platform.node(),
+                'profiles': {stage: asdict(p) for stage, p in profiles.items()},
+                'results': results,
+            }
+            baseline = None
+            if args.baseline:
+                with open(args.baseline, 'r') as f:
+                    baseline = json.load(f)
+            print_report(results, baseline)
+
+            output = args.output or os.path.join('bench_results', f'{commit}.json')
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Saved benchmark results to {output}")
+        except Exception:
+            logger.exception("Error in pipeline_benchmark")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from pipeline_metrics import REGISTRY, current_trace_id, current_stage
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')          # json | text
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Sampled events (extra={'sample': key}) are let through at most once per interval per key
+LOG_SAMPLE_INTERVAL_S = float(os.getenv('LOG_SAMPLE_INTERVAL_S', '1.0'))
+
+LOG_DROPPED = REGISTRY.counter(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full', ('level',))
+LOG_SAMPLED_OUT = REGISTRY.counter(
+    'log_records_sampled_out_total', 'High-volume log records suppressed by sampling', ('key',))
+
+_context: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else was passed via extra= and is emitted as a field
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (e.g. item=frame_path, channel=name) to every record logged in this context."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the trace, stage and log_context of the thread that logged them.
+
+    Runs on the caller's thread: context variables are not visible from the writer thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        record.stage = current_stage()
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Rate-limits records logged with extra={'sample': key} to one per interval per key.
+
+    The next record let through for a key carries the number suppressed since the last one.
+    """
+
+    def __init__(self, interval_s: float = LOG_SAMPLE_INTERVAL_S):
+        super().__init__()
+        self.interval_s = interval_s
+        self._lock = threading.Lock()
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, float('-inf')) < self.interval_s:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                LOG_SAMPLED_OUT.inc(key=key)
+                return False
+            self._last[key] = now
+            record.sampled_out = self._suppressed.pop(key, 0)
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without ever waiting on I/O.
+
+    When the queue is full, records below WARNING are dropped (and counted); warnings and
+    errors wait briefly for space rather than being lost.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, while their arguments and frames are still
+        # current; everything else is formatted on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                try:
+                    self.queue.put(record, timeout=1.0)
+                    return
+                except queue.Full:
+                    pass
+            LOG_DROPPED.inc(level=record.levelname)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('[%(asctime)s] [%(process)d] %(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        trace_id = getattr(record, 'trace_id', None)
+        return f"{line} [trace {trace_id}]" if trace_id else line
+
+_listener: Optional[QueueListener] = None
+_writer: Optional[logging.Handler] = None
+_level = LOG_LEVEL
+_configure_lock = threading.Lock()
+
+def configure_logging(level: str = None, fmt: str = None, stream=None) -> None:
+    """Route all logging through one queue to a background writer. Idempotent per process."""
+    global _listener, _writer, _level
+    with _configure_lock:
+        if _writer is not None:
+            return
+        writer = logging.StreamHandler(stream or sys.stdout)
+        writer.setFormatter(TextFormatter() if (fmt or LOG_FORMAT) == 'text' else JsonFormatter())
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = NonBlockingQueueHandler(log_queue)
+        handler.addFilter(ContextFilter())
+        handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        # Third-party libraries stay at WARNING; LOG_LEVEL applies to the pipeline's own loggers
+        root.setLevel(logging.WARNING)
+        _level = level or LOG_LEVEL
+
+        _writer = writer
+        _listener = QueueListener(log_queue, writer)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        # Anything logged after this point (late atexit hooks) is written synchronously
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            if isinstance(existing, NonBlockingQueueHandler):
+                root.removeHandler(existing)
+        root.addHandler(_writer)
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    logger = logging.getLogger(name)
+    logger.setLevel(_level)
+    return logger
+
+# pipeline_metrics logs through the shared handler too, at the pipeline's level rather than
+# the root logger's WARNING; it is imported above, so it cannot call get_logger itself
+get_logger('pipeline_metrics')
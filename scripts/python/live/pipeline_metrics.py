@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import uuid
+import atexit
+import asyncio
+import logging
+import argparse
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Configured by pipeline_logging (which imports this module, so get_logger can't be used here)
+logger = logging.getLogger('pipeline_metrics')
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# --- Metric Types ---
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, '') for n in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                yield f'{self.name}_bucket', {**labels, 'le': le}, cumulative
+            yield f'{self.name}_sum', labels, row[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f'{name}{{{rendered}}} {value}')
+                else:
+                    lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'pipeline_stage_duration_seconds', 'Wall time spent in each pipeline stage', ('stage',))
+STAGE_CALLS = REGISTRY.counter(
+    'pipeline_stage_calls_total', 'Pipeline stage invocations by outcome', ('stage', 'status'))
+STAGE_BYTES = REGISTRY.counter(
+    'pipeline_stage_bytes_total', 'Bytes moved by each pipeline stage', ('stage', 'direction'))
+
+# --- Tracing ---
+_trace_id = contextvars.ContextVar('pipeline_trace_id', default=None)
+_span_id = contextvars.ContextVar('pipeline_span_id', default=None)
+_stage = contextvars.ContextVar('pipeline_stage', default=None)
+
+# Spans are only retained when a trace dump has been requested
+_spans: Optional[deque] = None
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+def current_stage() -> Optional[str]:
+    return _stage.get()
+
+@contextmanager
+def trace(trace_id: str = None):
+    """Bind a per-item trace ID to every span recorded inside the block."""
+    token = _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+@contextmanager
+def span(stage: str, **attrs):
+    span_id = uuid.uuid4().hex[:8] if _spans is not None else None
+    parent = _span_id.get()
+    token = _span_id.set(span_id)
+    stage_token = _stage.set(stage)
+    status = 'ok'
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _span_id.reset(token)
+        _stage.reset(stage_token)
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        STAGE_CALLS.inc(stage=stage, status=status)
+        if _spans is not None:
+            _spans.append({
+                'trace_id': _trace_id.get(), 'span_id': span_id, 'parent_id': parent,
+                'stage': stage, 'start': time.time() - elapsed, 'duration_s': elapsed,
+                'status': status, 'attrs': attrs,
+            })
+
+def instrumented(stage: str):
+    """Decorator recording latency, outcome and trace span for a sync or async call."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_bytes(stage: str, direction: str, count: int) -> None:
+    STAGE_BYTES.inc(count, stage=stage, direction=direction)
+
+def file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+# --- Exporters ---
+def write_prometheus(path: str) -> None:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(REGISTRY.render_prometheus())
+    os.replace(tmp_path, path)
+
+def dump_traces(path: str) -> None:
+    spans = list(_spans) if _spans is not None else []
+    with open(path, 'w') as f:
+        json.dump(spans, f, indent=2)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    logger.info(f"Serving Prometheus metrics on http://{host}:{server.server_port}/metrics")
+    return server
+
+_configured = False
+
+def configure_from_env() -> None:
+    """Enable exporters from METRICS_PORT, METRICS_FILE and TRACE_FILE (idempotent)."""
+    global _configured, _spans
+    if _configured:
+        return
+    _configured = True
+    port = os.getenv('METRICS_PORT')
+    if port:
+        start_metrics_server(int(port), os.getenv('METRICS_HOST', '127.0.0.1'))
+    metrics_file = os.getenv('METRICS_FILE')
+    if metrics_file:
+        atexit.register(write_prometheus, metrics_file)
+    trace_file = os.getenv('TRACE_FILE')
+    if trace_file:
+        _spans = deque(maxlen=int(os.getenv('TRACE_MAX_SPANS', '100000')))
+        atexit.register(dump_traces, trace_file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a pipeline JSON trace dump per stage")
+    parser.add_argument('-f', '--file', required=True, help='Trace file written via TRACE_FILE')
+    args = parser.parse_args()
+    # pipeline_logging imports this module, so it can only be pulled in here
+    from pipeline_logging import get_logger
+    get_logger('pipeline_metrics')
+
+    with open(args.file, 'r') as f:
+        spans = json.load(f)
+    stages: Dict[str, list] = {}
+    for s in spans:
+        stages.setdefault(s['stage'], []).append(s['duration_s'])
+    logger.info(f"{len(spans)} spans across {len({s['trace_id'] for s in spans})} traces")
+    for stage, durations in sorted(stages.items()):
+        logger.info(f"{stage:<12} n={len(durations):>6} total={sum(durations):10.2f}s "
+                    f"mean={sum(durations) / len(durations) * 1000:10.1f}ms")
+
+if __name__ == '__main__':
+    main()
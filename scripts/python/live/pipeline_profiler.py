@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import pstats
+import cProfile
+import resource
+import threading
+import subprocess
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from pipeline_metrics import current_stage
+from pipeline_logging import get_logger
+
+logger = get_logger('pipeline_profiler')
+
+SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+TOP_N = 40
+
+def add_profile_argument(parser) -> None:
+    """Register the shared --profile option on an entry point's argument parser."""
+    parser.add_argument('--profile', nargs='?', const='profiles', default=None, metavar='DIR',
+                        help='Capture CPU, allocation and subprocess profiles into DIR '
+                             '(default: ./profiles)')
+
+# --- Stack Sampler ---
+class StackSampler:
+    """Samples every thread's Python stack into flamegraph-compatible folded stacks."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(parts))] += 1
+
+    def write_folded(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+# --- Thread Profiling ---
+class ThreadProfilers:
+    """One cProfile.Profile per thread started during the session, merged into the report.
+
+    Before Python 3.12 cProfile only sees the thread that enables it; without this the threaded
+    entry points would profile nothing but the main thread waiting on futures. From 3.12 it runs
+    on sys.monitoring, where one profiler already covers every thread and a second cannot be
+    enabled, so this does nothing there.
+    """
+
+    needed = sys.version_info < (3, 12)
+
+    def __init__(self):
+        self.profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _bootstrap(self, frame, event, arg):
+        # First profile event on a new thread: hand the thread over to its own profiler
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active: leave this thread unprofiled rather than kill it,
+            # and uninstall this hook so it isn't retried on every call
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self.profilers.append(profiler)
+
+    def start(self) -> None:
+        if self.needed:
+            threading.setprofile(self._bootstrap)
+
+    def stop(self) -> None:
+        if self.needed:
+            threading.setprofile(None)
+
+    def merge_into(self, stats: pstats.Stats) -> pstats.Stats:
+        with self._lock:
+            profilers = list(self.profilers)
+        for profiler in profilers:
+            profiler.create_stats()
+            # A thread that exited before its first call has nothing to merge
+            if profiler.stats:
+                stats.add(profiler)
+        return stats
+
+# --- Subprocess Tracking ---
+class _ChildRecord:
+    __slots__ = ('args', 'stage', 'start', 'end')
+
+    def __init__(self, args, stage):
+        self.args = args
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.end = None
+
+_children: List[_ChildRecord] = []
+_children_lock = threading.Lock()
+_original_popen = subprocess.Popen
+
+class _ProfiledPopen(_original_popen):
+    """Popen that records wall time of each child (e.g. moviepy's ffmpeg) per pipeline stage."""
+
+    def __init__(self, args, *pargs, **kwargs):
+        self._profile_record = _ChildRecord(args, current_stage() or 'unstaged')
+        with _children_lock:
+            _children.append(self._profile_record)
+        super().__init__(args, *pargs, **kwargs)
+
+    def _profile_done(self):
+        if self.returncode is not None and self._profile_record.end is None:
+            self._profile_record.end = time.perf_counter()
+
+    def poll(self):
+        result = super().poll()
+        self._profile_done()
+        return result
+
+    def wait(self, timeout=None):
+        try:
+            return super().wait(timeout)
+        finally:
+            self._profile_done()
+
+# --- Worker Processes ---
+# Set while a session is running, so media_worker_pool knows to profile its jobs
+_session_active = False
+_worker_lock = threading.Lock()
+_worker_cpu = [0.0, 0.0]        # user, sys seconds reported by pool workers
+_worker_stats: List[dict] = []
+
+class _WorkerStats:
+    """cProfile stats shipped back from a worker, in the shape pstats.Stats.add() accepts."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+def is_profiling() -> bool:
+    return _session_active
+
+@contextmanager
+def worker_profile(enabled: bool):
+    """Profile one job inside a pool worker; yields a dict that holds its usage afterwards.
+
+    The worker's CPU time, child processes and cProfile stats go back to the parent, which
+    adds them to its session with record_worker_profile().
+    """
+    usage: dict = {}
+    if not enabled:
+        yield usage
+        return
+    with _children_lock:
+        _children.clear()
+    subprocess.Popen = _ProfiledPopen
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield usage
+    finally:
+        profiler.disable()
+        subprocess.Popen = _original_popen
+        self_after = resource.getrusage(resource.RUSAGE_SELF)
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        now = time.perf_counter()
+        with _children_lock:
+            usage['children'] = [(_command_name(rec.args), (rec.end or now) - rec.start) for rec in _children]
+            _children.clear()
+        usage['cpu'] = (self_after.ru_utime - self_before.ru_utime + children_after.ru_utime - children_before.ru_utime,
+                        self_after.ru_stime - self_before.ru_stime + children_after.ru_stime - children_before.ru_stime)
+        profiler.create_stats()
+        usage['stats'] = profiler.stats
+
+def record_worker_profile(usage: dict) -> None:
+    """Add a worker job's usage to the running session, under the caller's current stage."""
+    if not _session_active or not usage:
+        return
+    stage = current_stage() or 'unstaged'
+    now = time.perf_counter()
+    with _children_lock:
+        for command, wall in usage.get('children', ()):
+            record = _ChildRecord([command], stage)
+            record.start, record.end = now - wall, now
+            _children.append(record)
+    with _worker_lock:
+        user, system = usage.get('cpu', (0.0, 0.0))
+        _worker_cpu[0] += user
+        _worker_cpu[1] += system
+        if usage.get('stats'):
+            _worker_stats.append(usage['stats'])
+
+def _command_name(args) -> str:
+    argv = args if isinstance(args, (list, tuple)) else [args]
+    return os.path.basename(str(argv[0])) if argv else '?'
+
+def _summarise_children(now: float) -> Dict[str, dict]:
+    summary: Dict[str, dict] = {}
+    with _children_lock:
+        records = list(_children)
+    for rec in records:
+        s = summary.setdefault(rec.stage, {'count': 0, 'wall_s': 0.0, 'running': 0, 'commands': Counter()})
+        s['count'] += 1
+        s['wall_s'] += (rec.end or now) - rec.start
+        s['running'] += rec.end is None
+        s['commands'][_command_name(rec.args)] += 1
+    return summary
+
+# --- Session ---
+@contextmanager
+def profile_session(output_dir: Optional[str], name: str):
+    """Profile the enclosed block when output_dir is set; otherwise a no-op."""
+    global _session_active
+    if not output_dir:
+        yield
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+
+    with _children_lock:
+        _children.clear()
+    with _worker_lock:
+        _worker_cpu[:] = [0.0, 0.0]
+        _worker_stats.clear()
+    _session_active = True
+    subprocess.Popen = _ProfiledPopen
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    tracemalloc.start(25)
+    sampler = StackSampler()
+    threads = ThreadProfilers()
+    profiler = cProfile.Profile()
+    wall_start = time.perf_counter()
+    sampler.start()
+    threads.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        threads.stop()
+        sampler.stop()
+        _session_active = False
+        wall = time.perf_counter() - wall_start
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        subprocess.Popen = _original_popen
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        stats = threads.merge_into(pstats.Stats(profiler))
+        with _worker_lock:
+            for worker_stats in _worker_stats:
+                stats.add(_WorkerStats(worker_stats))
+            worker_cpu = tuple(_worker_cpu)
+        stats.dump_stats(f'{base}.prof')
+        sampler.write_folded(f'{base}.folded')
+        with open(f'{base}.txt', 'w') as report:
+            _write_report(report, name, wall, peak, snapshot, stats,
+                          len(threads.profilers) if threads.needed else None,
+                          _summarise_children(time.perf_counter()),
+                          children_before, children_after, worker_cpu)
+        logger.info(f"Profile written to {base}.txt (.prof, .folded)")
+
+def _write_report(out, name, wall, peak, snapshot, stats, thread_count, children, before, after,
+                  worker_cpu) -> None:
+    out.write(f'Profile report for {name}\n')
+    if thread_count is None:
+        out.write('CPU profile: all threads\n')
+    else:
+        out.write(f'CPU profile: main thread + {thread_count} threads started during the session '
+                  f'(threads already running when it began are not included)\n')
+    out.write(f'Wall time: {wall:.3f}s  Peak traced memory: {peak / (1024 * 1024):.1f}MB  '
+              f'Max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MB\n')
+    # Media pool workers outlive the session, so their CPU is reported per job instead
+    out.write(f'Child CPU: user {after.ru_utime - before.ru_utime + worker_cpu[0]:.3f}s '
+              f'sys {after.ru_stime - before.ru_stime + worker_cpu[1]:.3f}s '
+              f'(media workers: user {worker_cpu[0]:.3f}s sys {worker_cpu[1]:.3f}s)\n\n')
+
+    out.write('== Subprocess wall time by stage ==\n')
+    if not children:
+        out.write('(no child processes)\n')
+    for stage, s in sorted(children.items(), key=lambda kv: -kv[1]['wall_s']):
+        commands = ', '.join(f'{cmd} x{n}' for cmd, n in s['commands'].most_common())
+        running = f" ({s['running']} still running)" if s['running'] else ''
+        out.write(f"{stage:<12} {s['count']:>4} procs {s['wall_s']:10.3f}s  [{commands}]{running}\n")
+
+    out.write(f'\n== Top {TOP_N} allocation sites ==\n')
+    for stat in snapshot.statistics('lineno')[:TOP_N]:
+        out.write(f'{stat}\n')
+
+    out.write(f'\n== Top {TOP_N} functions by cumulative time ==\n')
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(TOP_N)
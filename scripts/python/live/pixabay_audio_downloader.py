@@ -1,23 +1,16 @@
 #!/usr/bin/env python3
 import os
 import sys
+import uuid
 import signal
-import logging
 import argparse
-import requests
 from dotenv import load_dotenv
+from pipeline_profiler import add_profile_argument, profile_session
+from resilient_http import get_http_client
+from artifact_store import ArtifactStore, get_artifact_store
+from pipeline_logging import get_logger
 
-def setup_logging():
-    logger = logging.getLogger('pixabay_audio_downloader')
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(
-        '[%(asctime)s] [%(process)d] %(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(handler)
-    return logger
-
-logger = setup_logging()
+logger = get_logger('pixabay_audio_downloader')
 
 def handle_signal(signum, frame):
     logger.info(f"Received signal {signum}, exiting.")
@@ -27,46 +20,59 @@ signal.signal(signal.SIGTERM, handle_signal)
 signal.signal(signal.SIGINT, handle_signal)
 
 class PixabayAudioDownloader:
-    def __init__(self):
+    def __init__(self, store: ArtifactStore = None):
         load_dotenv()
+        self.store = store or get_artifact_store()
         self.api_key = os.getenv('PIXABAY_API_KEY')
         if not self.api_key:
             logger.error('PIXABAY_API_KEY not set')
             sys.exit(1)
         self.base_url = 'https://pixabay.com/api/'
 
-    def download(self, query: str, per_page: int = 3):
+    def download(self, query: str, job_id: str, per_page: int = 3):
+        """Download clips into the artifact store, referenced by job_id until the caller releases it."""
+        http = get_http_client()
         params = {'key': self.api_key, 'q': query, 'audio_type': 'music', 'per_page': per_page}
-        response = requests.get(self.base_url, params=params)
+        response = http.get(self.base_url, params=params)
         response.raise_for_status()
         hits = response.json().get('hits', [])
         files = []
         for hit in hits:
             url = hit.get('audio_url')
-            filename = os.path.basename(url)
-            r = requests.get(url)
-            r.raise_for_status()
-            with open(filename, 'wb') as f:
-                f.write(r.content)
-            logger.info(f"Downloaded {filename}")
-            files.append(filename)
+            # Download to a private scratch file so concurrent runs never share a filename
+            tmp_path = self.store.scratch_path(os.path.splitext(os.path.basename(url))[1])
+            with http.get(url, stream=True) as r:
+                r.raise_for_status()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+            artifact = self.store.put(tmp_path, job_id=job_id, role='audio')
+            logger.info(f"Downloaded {os.path.basename(url)} -> {artifact.path}")
+            files.append(artifact.path)
         return files
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Download audio clips from Pixabay")
     parser.add_argument('-q', '--query', required=True, help='Search term')
     parser.add_argument('-n', '--num', type=int, default=3, help='Number of audio files')
+    add_profile_argument(parser)
     return parser.parse_args()
 
 def main():
     args = parse_args()
     downloader = PixabayAudioDownloader()
-    try:
-        files = downloader.download(args.query, args.num)
-        logger.info(f"Downloaded files: {files}")
-    except Exception:
-        logger.exception("Error downloading audio")
-        sys.exit(1)
+    # Pinned for the run so a later put's eviction pass cannot remove them before they are used
+    owner = f'pixabay:{uuid.uuid4().hex[:8]}'
+    with profile_session(args.profile, 'pixabay_audio_downloader'):
+        try:
+            files = downloader.download(args.query, owner, args.num)
+            logger.info(f"Downloaded files: {files}")
+        except Exception:
+            logger.exception("Error downloading audio")
+            sys.exit(1)
+        finally:
+            # The files stay cached but become eligible for eviction
+            downloader.store.release(owner)
 
 if __name__ == '__main__':
     main()
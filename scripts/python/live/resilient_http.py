@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+import time
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from pipeline_metrics import REGISTRY
+from pipeline_logging import get_logger
+
+logger = get_logger('resilient_http')
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Safe to resend after a timeout or gateway error; anything else may already have been acted on upstream
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Outbound HTTP requests by host and status', ('host', 'status'))
+HTTP_RETRIES = REGISTRY.counter(
+    'http_retries_total', 'Outbound HTTP retries by host and reason', ('host', 'reason'))
+HTTP_THROTTLE_WAIT = REGISTRY.histogram(
+    'http_rate_limit_wait_seconds', 'Time spent waiting on the client-side rate limiter', ('host',),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 15, 60))
+CIRCUIT_STATE = REGISTRY.gauge(
+    'http_circuit_state', 'Circuit breaker state per host (0=closed, 1=half-open, 2=open)', ('host',))
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+# --- Host Policies ---
+class HostPolicy:
+    def __init__(self, rate: float, burst: int, max_retries: int = 4, backoff_base: float = 0.5,
+                 backoff_max: float = 30.0, timeout=(5, 60), pool_size: int = 10,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, probe_timeout: float = None,
+                 retry_after_max: float = 300.0):
+        self.rate = rate                          # sustained requests per second
+        self.burst = burst                        # token bucket capacity
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # A longer Retry-After is handed back to the caller instead of being waited out
+        self.retry_after_max = retry_after_max
+        self.timeout = timeout                    # (connect, read) seconds
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # A half-open probe that has not reported back within this long is presumed lost
+        if probe_timeout is None:
+            probe_timeout = sum(timeout) if isinstance(timeout, tuple) else timeout
+        self.probe_timeout = probe_timeout
+
+# Matched to each provider's documented quota; unknown hosts use DEFAULT_POLICY
+PROVIDER_POLICIES: Dict[str, HostPolicy] = {
+    'api.runwayml.com': HostPolicy(rate=1.0, burst=2, max_retries=5, timeout=(10, 300)),
+    'api.dev.runwayml.com': HostPolicy(rate=1.0, burst=2, max_retries=5, timeout=(10, 300)),
+    'pixabay.com': HostPolicy(rate=100 / 60.0, burst=100),
+    'cdn.pixabay.com': HostPolicy(rate=10.0, burst=10, timeout=(5, 120)),
+    'www.googleapis.com': HostPolicy(rate=10.0, burst=20, timeout=(10, 300)),
+    'youtube.googleapis.com': HostPolicy(rate=10.0, burst=20, timeout=(10, 300)),
+    'api.linkedin.com': HostPolicy(rate=2.0, burst=5),
+}
+DEFAULT_POLICY = HostPolicy(rate=5.0, burst=10)
+
+def register_policy(host: str, policy: HostPolicy) -> None:
+    PROVIDER_POLICIES[host] = policy
+
+# --- Rate Limiting ---
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available; returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+# --- Circuit Breaking ---
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: float, probe_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(self.CLOSED, host=host)
+
+    def _set_state(self, state: int) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit for {self.host} -> {('closed', 'half-open', 'open')[state]}")
+        self._state = state
+        CIRCUIT_STATE.set(state, host=self.host)
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit open for {self.host}, failing fast")
+                # Let a single probe through
+                self._set_state(self.HALF_OPEN)
+                self._probe_started = time.monotonic()
+            elif self._state == self.HALF_OPEN:
+                if time.monotonic() - self._probe_started < self.probe_timeout:
+                    raise CircuitOpenError(f"Circuit half-open for {self.host}, probe in flight")
+                # The probe never reported back; let another one through
+                logger.warning(f"Circuit probe for {self.host} timed out, probing again")
+                self._probe_started = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+# --- Client ---
+class _HostState:
+    def __init__(self, host: str, policy: HostPolicy):
+        self.policy = policy
+        self.limiter = TokenBucket(policy.rate, policy.burst)
+        self.breaker = CircuitBreaker(host, policy.failure_threshold, policy.reset_timeout,
+                                      policy.probe_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+class ResilientHttpClient:
+    """Pooled per-host sessions with token-bucket limiting, jittered retries and circuit breaking."""
+
+    def __init__(self):
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host: str) -> _HostState:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(host, PROVIDER_POLICIES.get(host, DEFAULT_POLICY))
+            return state
+
+    @contextmanager
+    def guarded(self, host: str):
+        """Apply the host's rate limit and circuit breaker to a call made by another library."""
+        state = self._host(host)
+        state.breaker.before_call()
+        HTTP_THROTTLE_WAIT.observe(state.limiter.acquire(), host=host)
+        healthy = False
+        try:
+            yield
+            healthy = True
+        except Exception as e:
+            # Client errors (quota, permissions) say nothing about the host's health, and the
+            # breaker is shared by every channel in the process
+            healthy = not _is_upstream_failure(e)
+            raise
+        finally:
+            if healthy:
+                state.breaker.record_success()
+            else:
+                state.breaker.record_failure()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlparse(url).hostname or ''
+        state = self._host(host)
+        policy = state.policy
+        kwargs.setdefault('timeout', policy.timeout)
+
+        attempt = 0
+        while True:
+            state.breaker.before_call()
+            HTTP_THROTTLE_WAIT.observe(state.limiter.acquire(), host=host)
+            healthy = False
+            try:
+                response = state.session.request(method, url, **kwargs)
+                # 429 is the upstream pacing us, not a sign that it is degraded
+                healthy = response.status_code < 500
+            except (requests.ConnectionError, requests.Timeout) as e:
+                HTTP_REQUESTS.inc(host=host, status='error')
+                if attempt >= policy.max_retries or not _safe_to_retry(method, e):
+                    raise
+                reason, delay = type(e).__name__, self._backoff(policy, attempt)
+            else:
+                HTTP_REQUESTS.inc(host=host, status=str(response.status_code))
+                status = response.status_code
+                if (status not in RETRYABLE_STATUS or attempt >= policy.max_retries
+                        or not _safe_to_retry(method, status)):
+                    return response
+                retry_after = _retry_after(response)
+                if retry_after is not None and retry_after > policy.retry_after_max:
+                    logger.warning(f"{method} {host} returned {status} with Retry-After {retry_after:.0f}s, "
+                                   f"over the {policy.retry_after_max:.0f}s limit; not retrying")
+                    return response
+                reason = str(status)
+                delay = retry_after if retry_after is not None else self._backoff(policy, attempt)
+                response.close()
+            finally:
+                # Every attempt reports an outcome, whatever it raised, so a half-open probe
+                # cannot leave the breaker waiting forever
+                if healthy:
+                    state.breaker.record_success()
+                else:
+                    state.breaker.record_failure()
+
+            attempt += 1
+            HTTP_RETRIES.inc(host=host, reason=reason)
+            logger.warning(f"{method} {host} failed ({reason}), retry {attempt}/{policy.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    @staticmethod
+    def _backoff(policy: HostPolicy, attempt: int) -> float:
+        # Full jitter: spread retries from many workers across the whole window
+        return random.uniform(0, min(policy.backoff_max, policy.backoff_base * (2 ** attempt)))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+def _safe_to_retry(method: str, failure) -> bool:
+    """Whether a failed attempt (an exception or a status code) can be resent."""
+    if method.upper() in IDEMPOTENT_METHODS:
+        return True
+    # After a read timeout or a 5xx the server may have accepted the request (e.g. a Runway
+    # job); resending a POST could run it twice. A 429 was turned away before processing.
+    if isinstance(failure, int):
+        return failure == 429
+    return not isinstance(failure, requests.ReadTimeout)
+
+def _is_upstream_failure(error: Exception) -> bool:
+    """True for 5xx responses and transport errors, the failures a circuit breaker is for."""
+    # googleapiclient's HttpError carries .resp.status; requests' HTTPError .response.status_code
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return int(status) >= 500
+    # httplib2 (googleapiclient's transport) raises its own errors for DNS and protocol failures
+    return (isinstance(error, (requests.RequestException, OSError))
+            or type(error).__module__.split('.')[0] == 'httplib2')
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+_client: Optional[ResilientHttpClient] = None
+_client_lock = threading.Lock()
+
+def get_http_client() -> ResilientHttpClient:
+    """Process-wide client so every caller shares the same pools, limiters and breakers."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ResilientHttpClient()
+        return _client
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import shutil
+import signal
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Protocol, Set
+from pipeline_metrics import span, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
+
+logger = get_logger('runway_topaz_batch')
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv')
+
+# Children we started, so shutdown only terminates our own tools
+_running: Set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+# Set on SIGINT/SIGTERM; workers check it before starting each tool
+_stopping = threading.Event()
+
+class BatchStopped(Exception):
+    pass
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    _stopping.set()
+    with _running_lock:
+        for proc in _running:
+            proc.terminate()
+    sys.exit(128 + signum)
+
+def _check_stopping(infile: str) -> None:
+    if _stopping.is_set():
+        raise BatchStopped(f"Batch stopped before {infile} was finished")
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+# --- Tool Runner Protocols for Mocking ---
+class ToolRunner(Protocol):
+    def generate(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        ...
+
+    def enhance(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        ...
+
+class RealToolRunner:
+    def __init__(self):
+        for tool in ('runway', 'topaz'):
+            if not shutil.which(tool):
+                raise FileNotFoundError(f"'{tool}' CLI not found on PATH")
+
+    def generate(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        self._run(['runway', 'ml', 'generate', infile, '--output', outfile], log_path, cpus)
+
+    def enhance(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        self._run(['topaz', 'video-enhance', '--input', infile, '--output', outfile,
+                   '--preset', 'standard'], log_path, cpus)
+
+    @staticmethod
+    def _run(cmd: List[str], log_path: str, cpus: Optional[Set[int]]) -> None:
+        argv = cmd
+        pin_after_start = False
+        if cpus:
+            if shutil.which('taskset'):
+                # Pinned before exec; setting affinity after Popen races the tool's startup
+                argv = ['taskset', '--cpu-list', ','.join(map(str, sorted(cpus)))] + cmd
+            else:
+                pin_after_start = hasattr(os, 'sched_setaffinity')
+        # Tool output goes to a per-file log instead of through the logger line by line
+        with open(log_path, 'ab') as log_file:
+            # Checked under the lock so a signal cannot slip in between the check and the start
+            with _running_lock:
+                if _stopping.is_set():
+                    raise BatchStopped(f"Batch stopped before running {cmd[0]}")
+                proc = subprocess.Popen(argv, stdout=log_file, stderr=subprocess.STDOUT,
+                                        stdin=subprocess.DEVNULL)
+                _running.add(proc)
+            try:
+                if pin_after_start:
+                    try:
+                        os.sched_setaffinity(proc.pid, cpus)
+                    except OSError:
+                        pass  # child may already have exited
+                returncode = proc.wait()
+            finally:
+                with _running_lock:
+                    _running.discard(proc)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+
+class MockToolRunner:
+    def __init__(self, delay: float = 0.0):
+        logger.info("Initializing MockToolRunner")
+        self.delay = delay
+
+    def generate(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        time.sleep(self.delay)
+        shutil.copyfile(infile, outfile)
+
+    def enhance(self, infile: str, outfile: str, log_path: str, cpus: Optional[Set[int]]) -> None:
+        time.sleep(self.delay)
+        shutil.copyfile(infile, outfile)
+
+# --- CPU Affinity ---
+class CpuSlots:
+    """Hands out disjoint CPU sets so concurrent jobs do not contend for the same cores."""
+
+    def __init__(self, cpus_per_job: int):
+        self._free: List[Set[int]] = []
+        self._cond = threading.Condition()
+        if cpus_per_job > 0 and hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+            self._free = [set(cpus[i:i + cpus_per_job])
+                          for i in range(0, len(cpus) - cpus_per_job + 1, cpus_per_job)]
+        self.enabled = bool(self._free)
+
+    def acquire(self) -> Optional[Set[int]]:
+        if not self.enabled:
+            return None
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            return self._free.pop()
+
+    def release(self, cpus: Optional[Set[int]]) -> None:
+        if cpus is None:
+            return
+        with self._cond:
+            self._free.append(cpus)
+            self._cond.notify()
+
+# --- Progress ---
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, ok: bool, name: str) -> None:
+        with self._lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            elapsed = time.monotonic() - self.start
+            eta = elapsed / self.done * (self.total - self.done)
+            logger.info(f"[{self.done}/{self.total}] {'OK' if ok else 'FAILED'} {name} "
+                        f"- elapsed {_fmt(elapsed)}, ETA {_fmt(eta)}")
+
+def _fmt(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+# --- Core Functionality ---
+def output_path_for(infile: str, output_dir: str) -> str:
+    stem, ext = os.path.splitext(os.path.basename(infile))
+    return os.path.join(output_dir, f"{stem}_topaz{ext}")
+
+def is_up_to_date(infile: str, outfile: str) -> bool:
+    return os.path.exists(outfile) and os.path.getmtime(outfile) >= os.path.getmtime(infile)
+
+def find_inputs(input_dir: str) -> List[str]:
+    return sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+class BatchRunner:
+    def __init__(self, tools: ToolRunner, workers: int, runway_concurrency: int,
+                 topaz_concurrency: int, cpus_per_job: int = 0):
+        self.tools = tools
+        self.workers = workers
+        self.runway_slots = threading.BoundedSemaphore(runway_concurrency)
+        self.topaz_slots = threading.BoundedSemaphore(topaz_concurrency)
+        self.cpu_slots = CpuSlots(cpus_per_job)
+
+    def process(self, infile: str, outfile: str) -> None:
+        stem, ext = os.path.splitext(outfile)
+        generated = f"{stem}.runway.tmp{ext}"
+        partial = f"{stem}.partial{ext}"
+        log_path = f"{outfile}.log"
+        try:
+            _check_stopping(infile)
+            with self.runway_slots, span('runway_cli'):
+                _check_stopping(infile)
+                self.tools.generate(infile, generated, log_path, None)
+            if not os.path.exists(generated):
+                raise RuntimeError(f"Runway ML generation produced no output for {infile}")
+            cpus = self.cpu_slots.acquire()
+            try:
+                with self.topaz_slots, span('topaz_enhance'):
+                    _check_stopping(infile)
+                    self.tools.enhance(generated, partial, log_path, cpus)
+            finally:
+                self.cpu_slots.release(cpus)
+            if not os.path.exists(partial):
+                raise RuntimeError(f"Topaz Video AI enhancement produced no output for {generated}")
+            # Only publish complete files so an interrupted run is never mistaken for up to date
+            os.replace(partial, outfile)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+        finally:
+            for leftover in (generated, partial):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+    def run(self, input_dir: str, output_dir: str, force: bool = False) -> int:
+        os.makedirs(output_dir, exist_ok=True)
+        inputs = find_inputs(input_dir)
+        jobs = []
+        for infile in inputs:
+            outfile = output_path_for(infile, output_dir)
+            if not force and is_up_to_date(infile, outfile):
+                logger.debug(f"Skipping up-to-date {outfile}", extra={'sample': 'skip_up_to_date'})
+                continue
+            jobs.append((infile, outfile))
+        if not inputs:
+            logger.warning(f"No video files found in {input_dir}")
+            return 0
+        if not jobs:
+            logger.info(f"All {len(inputs)} outputs are up to date")
+            return 0
+
+        logger.info(f"Processing {len(jobs)} files with {self.workers} workers")
+        progress = Progress(len(jobs))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                futures = {pool.submit(self.process, infile, outfile): infile for infile, outfile in jobs}
+                for future in as_completed(futures):
+                    infile = futures[future]
+                    try:
+                        future.result()
+                        progress.update(True, os.path.basename(infile))
+                    except Exception as e:
+                        logger.error(f"Failed to process {infile}: {e}")
+                        progress.update(False, os.path.basename(infile))
+            except BaseException:
+                # Interrupted: drop queued files rather than letting the with block run them all
+                _stopping.set()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        logger.info(f"Completed {progress.done - progress.failed}/{progress.total} files")
+        return progress.failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel Runway ML -> Topaz Video AI batch runner")
+    parser.add_argument('input_dir', help='Directory of .mp4/.mov/.mkv inputs')
+    parser.add_argument('output_dir', help='Directory for enhanced outputs')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1, help='Files in flight')
+    parser.add_argument('--runway-concurrency', type=int, default=2, help='Concurrent runway CLI calls')
+    parser.add_argument('--topaz-concurrency', type=int, default=1, help='Concurrent topaz CLI calls')
+    parser.add_argument('--cpus-per-job', type=int, default=0, help='Pin each topaz job to N dedicated CPUs')
+    parser.add_argument('-f', '--force', action='store_true', help='Reprocess up-to-date outputs')
+    parser.add_argument('--mock', action='store_true', help='Use mock tool runner (copies files)')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_env()
+    if not os.path.isdir(args.input_dir):
+        logger.error(f"Input directory '{args.input_dir}' does not exist")
+        sys.exit(1)
+    with profile_session(args.profile, 'runway_topaz_batch'):
+        try:
+            tools = MockToolRunner(float(os.getenv('MOCK_TOOL_DELAY', '0'))) if args.mock else RealToolRunner()
+            runner = BatchRunner(tools, args.workers, args.runway_concurrency,
+                                 args.topaz_concurrency, args.cpus_per_job)
+            failed = runner.run(args.input_dir, args.output_dir, args.force)
+        except Exception:
+            logger.exception("Error in runway_topaz_batch")
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
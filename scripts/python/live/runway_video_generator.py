@@ -1,20 +1,18 @@
 #!/usr/bin/env python3
 import os
-import logging
 import signal
 import sys
 import argparse
 import asyncio
-import requests
 from dotenv import load_dotenv
 from typing import Protocol, Awaitable
+from pipeline_metrics import instrumented, record_bytes, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from resilient_http import get_http_client
+from pipeline_logging import get_logger
 
 # --- Logging Setup ---
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
-logger.addHandler(handler)
+logger = get_logger('runway_video_generator')
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
@@ -37,14 +35,18 @@ class RealRunwayClient:
             logger.error('RUNWAY_API_KEY not set')
             sys.exit(1)
 
+    @instrumented('runway')
     async def generate(self, prompt: str) -> bytes:
         logger.info(f"[REAL] Generating video for prompt '{prompt}'")
-        response = requests.post(
+        # Blocking HTTP runs off the event loop so concurrent generations can overlap
+        response = await asyncio.to_thread(
+            get_http_client().post,
             self.api_url,
             json={'prompt': prompt},
             headers={'Authorization': f'Bearer {self.api_key}'}
         )
         response.raise_for_status()
+        record_bytes('runway', 'in', len(response.content))
         return response.content
 
 class MockRunwayClient:
@@ -62,18 +64,21 @@ async def _async_main():
     parser = argparse.ArgumentParser(description="Runway Video Generator with Mock Support")
     parser.add_argument('-p', '--prompt', required=True, help='Text prompt for video generation')
     parser.add_argument('--mock', action='store_true', help='Use mock Runway client')
+    add_profile_argument(parser)
     args = parser.parse_args()
+    configure_from_env()
 
     client = MockRunwayClient() if args.mock else RealRunwayClient()
-    try:
-        video = await generate_with_runway(client, args.prompt)
-        output_path = os.getenv('OUTPUT_VIDEO_PATH', 'output.mp4')
-        with open(output_path, 'wb') as f:
-            f.write(video)
-        logger.info(f"Saved video to {output_path}")
-    except Exception:
-        logger.exception("Error in runway_video_generator")
-        sys.exit(1)
+    with profile_session(args.profile, 'runway_video_generator'):
+        try:
+            video = await generate_with_runway(client, args.prompt)
+            output_path = os.getenv('OUTPUT_VIDEO_PATH', 'output.mp4')
+            with open(output_path, 'wb') as f:
+                f.write(video)
+            logger.info(f"Saved video to {output_path}")
+        except Exception:
+            logger.exception("Error in runway_video_generator")
+            sys.exit(1)
 
 def main():
     asyncio.run(_async_main())
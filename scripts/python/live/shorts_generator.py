@@ -2,47 +2,61 @@
 import os
 import sys
 import signal
-import logging
 import argparse
 from typing import Protocol
 from moviepy.editor import VideoFileClip
+from media_analysis import load_analysis, best_window
+from pipeline_metrics import instrumented, record_bytes, file_size, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from pipeline_logging import get_logger
+from media_worker_pool import MediaWorkerPool, get_media_pool
 
-def setup_logging():
-    logger = logging.getLogger('shorts_generator')
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(
-        '[%(asctime)s] [%(process)d] %(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(handler)
-    return logger
-
-logger = setup_logging()
+logger = get_logger('shorts_generator')
 
 def handle_signal(signum, frame):
     logger.info(f"Received signal {signum}, exiting.")
-    # Kill any potential moviepy subprocesses
-    os.killpg(os.getpgid(0), signal.SIGTERM)
+    # Renders run in media workers, which the pool kills (with their ffmpeg children) at exit
     sys.exit(0)
 
 signal.signal(signal.SIGTERM, handle_signal)
 signal.signal(signal.SIGINT, handle_signal)
 
+def render_short(input_video: str, start: float, length: float, output_path: str) -> str:
+    """Encode [start, start + length) of input_video; runs in a media worker."""
+    # Closing both clips stops their ffmpeg readers; moviepy leaves them running otherwise
+    with VideoFileClip(input_video) as clip:
+        short = clip.subclip(start, start + length)
+        try:
+            # Keep moviepy's temp audio beside the output rather than in the working directory
+            short.write_videofile(output_path, codec="libx264", audio_codec="aac",
+                                  temp_audiofile=f"{output_path}.temp_audio.m4a")
+        finally:
+            short.close()
+    return output_path
+
 class ShortsClient(Protocol):
-    def generate(self, input_video: str, length: int) -> str:
+    def generate(self, input_video: str, length: int, output_path: str = None) -> str:
         ...
 
 class RealShortsClient:
-    def generate(self, input_video: str, length: int) -> str:
+    def __init__(self, pool: MediaWorkerPool = None):
+        self.pool = pool
+
+    @instrumented('encode')
+    def generate(self, input_video: str, length: int, output_path: str = None) -> str:
         if not os.path.exists(input_video):
             logger.error(f"Input video not found: {input_video}")
             raise FileNotFoundError(f"Input video not found: {input_video}")
         
-        logger.info(f"[REAL] Generating short from '{input_video}' ({length}s)")
+        # Pick the most active window from the analysis sidecar, if one has been written
+        analysis = load_analysis(input_video)
+        start = best_window(analysis, length) if analysis else 0
+        logger.info(f"[REAL] Generating short from '{input_video}' ({length}s from {start:.1f}s)")
         try:
-            clip = VideoFileClip(input_video).subclip(0, length)
-            output_path = os.path.abspath(f"short_{os.path.basename(input_video)}")
-            clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
+            output_path = os.path.abspath(output_path or f"short_{os.path.basename(input_video)}")
+            (self.pool or get_media_pool()).run(render_short, input_video, start, length, output_path)
+            record_bytes('encode', 'in', file_size(input_video))
+            record_bytes('encode', 'out', file_size(output_path))
             logger.info(f"Short video created at {output_path}")
             return output_path
         except Exception as e:
@@ -53,29 +67,33 @@ class MockShortsClient:
     def __init__(self):
         logger.info("Initializing MockShortsClient")
     
-    def generate(self, input_video: str, length: int) -> str:
+    def generate(self, input_video: str, length: int, output_path: str = None) -> str:
         logger.info(f"[MOCK] Pretending to generate {length}s short from '{input_video}'")
         return f"mock_short_{os.path.basename(input_video)}"
 
-def generate_short(client: ShortsClient, input_video: str, length: int) -> str:
-    return client.generate(input_video, length)
+def generate_short(client: ShortsClient, input_video: str, length: int, output_path: str = None) -> str:
+    return client.generate(input_video, length, output_path)
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Generate a short clip from a video")
     parser.add_argument('-p', '--path', required=True, help='Path to input video')
     parser.add_argument('-l', '--length', type=int, default=15, help='Length in seconds')
+    parser.add_argument('-o', '--output', help='Output path (default: short_<input name> in the working directory)')
     parser.add_argument('--mock', action='store_true', help='Use mock Shorts client')
+    add_profile_argument(parser)
     return parser.parse_args()
 
 def main():
     args = parse_args()
+    configure_from_env()
     client = MockShortsClient() if args.mock else RealShortsClient()
-    try:
-        output_path = generate_short(client, args.path, args.length)
-        logger.info(f"Generated short: {output_path}")
-    except Exception:
-        logger.exception("Error generating short")
-        sys.exit(1)
+    with profile_session(args.profile, 'shorts_generator'):
+        try:
+            output_path = generate_short(client, args.path, args.length, args.output)
+            logger.info(f"Generated short: {output_path}")
+        except Exception:
+            logger.exception("Error generating short")
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
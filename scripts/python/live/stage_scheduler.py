@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+import os
+import math
+import time
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from pipeline_metrics import REGISTRY
+from pipeline_logging import get_logger
+
+logger = get_logger('stage_scheduler')
+
+# Scarce stages in the order an item passes through them (see RealYouTubeAutomator._process)
+PIPELINE_STAGES = ('runway', 'analysis', 'upload', 'encode')
+
+def _default_slots() -> Dict[str, int]:
+    cpus = os.cpu_count() or 1
+    slots = {'runway': 4, 'analysis': max(1, cpus // 2), 'upload': 2, 'encode': max(1, cpus // 2)}
+    # e.g. SCHEDULER_SLOTS="runway=2,upload=1"
+    for pair in filter(None, os.getenv('SCHEDULER_SLOTS', '').split(',')):
+        stage, _, count = pair.partition('=')
+        slots[stage.strip()] = int(count)
+    return slots
+
+# Per-stage latency assumed until enough real observations exist (seconds)
+LATENCY_PRIORS = {'runway': 120.0, 'analysis': 15.0, 'upload': 60.0, 'encode': 30.0}
+# An item is urgent once its slack falls below this multiple of its expected remaining time
+RISK_MARGIN = float(os.getenv('SCHEDULER_RISK_MARGIN', '1.25'))
+
+SCHEDULER_WAIT = REGISTRY.histogram(
+    'scheduler_wait_seconds', 'Time items waited for a stage slot', ('stage',),
+    buckets=(0.01, 0.1, 1, 5, 15, 60, 300, 900, 3600))
+SCHEDULER_QUEUED = REGISTRY.gauge('scheduler_queued_items', 'Items waiting for a stage slot', ('stage',))
+DEADLINES_AT_RISK = REGISTRY.gauge('scheduler_deadlines_at_risk', 'Tracked items expected to miss their deadline')
+
+def parse_deadline(value) -> Optional[float]:
+    """Epoch seconds from a number or an ISO-8601 timestamp (naive timestamps are local time)."""
+    if value is None or value == '':
+        return None
+    try:
+        deadline = float(value)
+    except ValueError:
+        deadline = datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    if not math.isfinite(deadline):
+        raise ValueError(f"deadline must be finite, got {value!r}")
+    return deadline
+
+def parse_priority(value) -> int:
+    """Integer priority from a JSON number or string; rejects infinities and NaN."""
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"priority must be finite, got {value!r}")
+    return int(value)
+
+class WorkItem:
+    def __init__(self, item_id: str, channel: str = '', priority: int = 0, deadline: float = None):
+        self.id = item_id
+        self.channel = channel
+        self.priority = priority              # higher runs first within a channel
+        self.deadline = deadline              # epoch seconds, None for best-effort
+        self.submitted = time.time()
+        self.completed_stages: List[str] = []
+        self.waiting_for: Optional[str] = None    # stage whose slot the item is queued for
+        self.at_risk = False
+
+    def mark_done(self, stage: str) -> None:
+        if stage not in self.completed_stages:
+            self.completed_stages.append(stage)
+
+    def remaining_stages(self) -> List[str]:
+        return [s for s in PIPELINE_STAGES if s not in self.completed_stages]
+
+class LatencyModel:
+    """Rolling per-stage service times, used to predict when an item will finish."""
+
+    def __init__(self, window: int = 200, priors: Dict[str, float] = None):
+        self._samples: Dict[str, deque] = {}
+        self._sorted: Dict[str, list] = {}   # sorted copy per stage, rebuilt after new samples
+        self._window = window
+        self._priors = priors or LATENCY_PRIORS
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+            self._sorted.pop(stage, None)
+
+    def quantile(self, stage: str, q: float) -> float:
+        with self._lock:
+            samples = self._sorted.get(stage)
+            if samples is None:
+                samples = self._sorted[stage] = sorted(self._samples.get(stage, ()))
+        if len(samples) < 5:
+            return self._priors.get(stage, 0.0)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+class DeadlineQueue:
+    """Waiting work ordered by urgency, then fair share between channels, then priority.
+
+    Urgent entries (see `is_urgent`) are served earliest-deadline-first ahead of everything
+    else. The rest go to the channel that has received the least service so far, and within
+    a channel by priority, then deadline, then arrival. Order is decided at pop time, so a
+    newly queued urgent item overtakes everything still waiting.
+    """
+
+    def __init__(self, is_urgent: Callable[[WorkItem, float], bool], service: Dict[str, float]):
+        self._entries: list = []
+        self._seq = itertools.count()
+        self._is_urgent = is_urgent
+        self._service = service               # channel -> seconds of stage time consumed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, item: WorkItem, payload=None) -> tuple:
+        if item.channel not in self._service:
+            # Newcomers start level with the least-served channel instead of at zero
+            self._service[item.channel] = min(self._service.values(), default=0.0)
+        entry = (item, next(self._seq), payload)
+        self._entries.append(entry)
+        return entry
+
+    def remove(self, entry: tuple) -> None:
+        self._entries.remove(entry)
+
+    def peek(self, now: float = None) -> Optional[tuple]:
+        if not self._entries:
+            return None
+        now = time.time() if now is None else now
+        urgent = [e for e in self._entries if e[0].deadline is not None and self._is_urgent(e[0], now)]
+        if urgent:
+            return min(urgent, key=lambda e: (e[0].deadline, -e[0].priority, e[1]))
+        return min(self._entries, key=lambda e: (
+            self._service.get(e[0].channel, 0.0), -e[0].priority,
+            e[0].deadline if e[0].deadline is not None else math.inf, e[1]))
+
+    def pop(self, now: float = None) -> Optional[tuple]:
+        entry = self.peek(now)
+        if entry is not None:
+            self._entries.remove(entry)
+        return entry
+
+class StageScheduler:
+    """Bounded slots per scarce stage, granted by DeadlineQueue order.
+
+    Only waiting work is reordered; a stage that has started always runs to completion.
+    """
+
+    def __init__(self, slots: Dict[str, int] = None, latency: LatencyModel = None):
+        self.slots = slots or _default_slots()
+        self.latency = latency or LatencyModel()
+        self._cond = threading.Condition()
+        self._service: Dict[str, float] = {}
+        self._queues = {stage: DeadlineQueue(self.is_urgent, self._service) for stage in self.slots}
+        self._in_use = {stage: 0 for stage in self.slots}
+        self._tracked: Dict[str, WorkItem] = {}
+
+    # --- Prediction ---
+    def expected_remaining(self, item: WorkItem, waiting_stage: str = None) -> float:
+        """Seconds until item finishes: p90 service time of each remaining stage plus queueing."""
+        total = sum(self.latency.quantile(stage, 0.9) for stage in item.remaining_stages())
+        if waiting_stage in self._queues:
+            ahead = len(self._queues[waiting_stage])
+            total += ahead / max(1, self.slots[waiting_stage]) * self.latency.quantile(waiting_stage, 0.5)
+        return total
+
+    def is_urgent(self, item: WorkItem, now: float) -> bool:
+        return item.deadline - now <= self.expected_remaining(item) * RISK_MARGIN
+
+    def _check_risk(self, item: WorkItem, waiting_stage: str = None) -> None:
+        if item.deadline is None or item.at_risk:
+            return
+        eta = time.time() + self.expected_remaining(item, waiting_stage)
+        if eta > item.deadline:
+            item.at_risk = True
+            logger.warning(f"Item {item.id} is expected to miss its deadline by {eta - item.deadline:.0f}s "
+                           f"(stages left: {', '.join(item.remaining_stages())})")
+        DEADLINES_AT_RISK.set(sum(1 for i in self._tracked.values() if i.at_risk))
+
+    # --- Item Tracking ---
+    @contextmanager
+    def tracking(self, item: WorkItem):
+        with self._cond:
+            self._tracked[item.id] = item
+            self._check_risk(item)
+        try:
+            yield item
+        finally:
+            with self._cond:
+                self._tracked.pop(item.id, None)
+                DEADLINES_AT_RISK.set(sum(1 for i in self._tracked.values() if i.at_risk))
+
+    @contextmanager
+    def slot(self, stage: str, item: WorkItem):
+        """Hold one of the stage's slots for the duration of the block."""
+        if stage not in self.slots:
+            yield
+            return
+        queue = self._queues[stage]
+        requested = time.monotonic()
+        with self._cond:
+            entry = queue.push(item)
+            item.waiting_for = stage
+            SCHEDULER_QUEUED.set(len(queue), stage=stage)
+            self._check_risk(item, stage)
+            try:
+                # Re-evaluated periodically as well: urgency grows while items wait
+                while self._in_use[stage] >= self.slots[stage] or queue.peek() is not entry:
+                    self._cond.wait(timeout=1.0)
+            except BaseException:
+                # e.g. SystemExit from a signal handler: a dead entry at the head would block
+                # every other waiter for this stage
+                queue.remove(entry)
+                item.waiting_for = None
+                SCHEDULER_QUEUED.set(len(queue), stage=stage)
+                self._cond.notify_all()
+                raise
+            queue.remove(entry)
+            item.waiting_for = None
+            self._in_use[stage] += 1
+            SCHEDULER_QUEUED.set(len(queue), stage=stage)
+        SCHEDULER_WAIT.observe(time.monotonic() - requested, stage=stage)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.latency.observe(stage, elapsed)
+            with self._cond:
+                self._in_use[stage] -= 1
+                self._service[item.channel] = self._service.get(item.channel, 0.0) + elapsed
+                item.mark_done(stage)
+                self._cond.notify_all()
+
+    # --- Reporting ---
+    def at_risk(self) -> List[dict]:
+        """Tracked items whose predicted finish is after their deadline, most overdue first."""
+        now = time.time()
+        report = []
+        with self._cond:
+            for item in self._tracked.values():
+                if item.deadline is None:
+                    continue
+                eta = now + self.expected_remaining(item, item.waiting_for)
+                if eta > item.deadline:
+                    report.append({'id': item.id, 'channel': item.channel, 'priority': item.priority,
+                                   'deadline': item.deadline, 'expected_finish': eta,
+                                   'late_by_s': eta - item.deadline,
+                                   'remaining_stages': item.remaining_stages()})
+        return sorted(report, key=lambda r: -r['late_by_s'])
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                'stages': {stage: {'slots': self.slots[stage], 'in_use': self._in_use[stage],
+                                   'queued': len(self._queues[stage]),
+                                   'p50_s': self.latency.quantile(stage, 0.5),
+                                   'p90_s': self.latency.quantile(stage, 0.9)}
+                           for stage in self.slots},
+                'channel_service_s': dict(self._service),
+                'tracked': len(self._tracked),
+            }
+
+_default_scheduler: Optional[StageScheduler] = None
+_default_lock = threading.Lock()
+
+def get_scheduler() -> StageScheduler:
+    """Process-wide scheduler shared by every automator in the process."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = StageScheduler()
+        return _default_scheduler
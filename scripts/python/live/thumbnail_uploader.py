@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import os
+import sys
+import signal
+import argparse
+from dotenv import load_dotenv
+from typing import Optional, Protocol
+from google_auth_utils import get_authenticated_service
+from googleapiclient.http import MediaFileUpload
+from media_analysis import load_analysis, analyze_video, thumbnail_paths
+from pipeline_metrics import instrumented, record_bytes, file_size, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from resilient_http import get_http_client
+from pipeline_logging import get_logger
+
+GOOGLE_API_HOST = 'www.googleapis.com'
+NUM_RETRIES = int(os.getenv('GOOGLE_API_NUM_RETRIES', '5'))
+
+logger = get_logger('thumbnail_uploader')
+
+def handle_signal(signum, frame):
+    logger.info(f"Received signal {signum}, exiting.")
+    sys.exit(0)
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+class ThumbnailClient(Protocol):
+    def upload_thumbnail(self, video_id: str, image_path: str) -> None:
+        ...
+
+class RealThumbnailClient:
+    def __init__(self, token_dir: str = None, client_secrets_file: str = None):
+        load_dotenv()
+        SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
+        try:
+            self.youtube = get_authenticated_service('youtube', 'v3', SCOPES,
+                                                     token_dir, client_secrets_file)
+        except Exception as e:
+            logger.error(f"Failed to authenticate with YouTube API: {e}")
+            sys.exit(1)
+
+    @instrumented('thumbnail')
+    def upload_thumbnail(self, video_id: str, image_path: str) -> None:
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Thumbnail not found: {image_path}")
+        logger.info(f"Setting thumbnail for '{video_id}' from '{image_path}'")
+        media = MediaFileUpload(image_path, mimetype='image/jpeg')
+        with get_http_client().guarded(GOOGLE_API_HOST):
+            self.youtube.thumbnails().set(videoId=video_id, media_body=media).execute(num_retries=NUM_RETRIES)
+        record_bytes('thumbnail', 'out', file_size(image_path))
+
+class MockThumbnailClient:
+    def __init__(self):
+        logger.info("Initializing MockThumbnailClient")
+
+    def upload_thumbnail(self, video_id: str, image_path: str) -> None:
+        logger.info(f"[MOCK] Pretending to set thumbnail for '{video_id}' from '{image_path}'")
+
+def upload_best_thumbnail(client: ThumbnailClient, video_id: str, video_path: str,
+                          analysis: dict = None) -> Optional[str]:
+    """Upload the top-ranked thumbnail candidate from the video's analysis sidecar."""
+    analysis = analysis or load_analysis(video_path)
+    candidates = thumbnail_paths(video_path, analysis) if analysis else []
+    if not candidates:
+        logger.warning(f"No thumbnail candidates for '{video_path}', keeping YouTube's default")
+        return None
+    client.upload_thumbnail(video_id, candidates[0])
+    return candidates[0]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Set a YouTube thumbnail from a video's analysis sidecar")
+    parser.add_argument('-i', '--id', required=True, help='YouTube video ID')
+    parser.add_argument('-p', '--path', required=True, help='Local path of the uploaded video')
+    parser.add_argument('--mock', action='store_true', help='Use mock Thumbnail client')
+    add_profile_argument(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_env()
+    client = MockThumbnailClient() if args.mock else RealThumbnailClient()
+    with profile_session(args.profile, 'thumbnail_uploader'):
+        try:
+            analysis = load_analysis(args.path) or analyze_video(args.path)
+            image = upload_best_thumbnail(client, args.id, args.path, analysis)
+            logger.info(f"Thumbnail: {image}")
+        except Exception:
+            logger.exception("Error in thumbnail_uploader")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
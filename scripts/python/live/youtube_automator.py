@@ -1,37 +1,41 @@
 #!/usr/bin/env python3
 import os
-import logging
+import uuid
 import signal
 import sys
 import argparse
 import asyncio
 from dotenv import load_dotenv
 from typing import Protocol
+from pipeline_logging import get_logger, log_context
+from media_worker_pool import shutdown_media_pool
 
 # --- Logging Setup ---
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
-logger.addHandler(handler)
+logger = get_logger('youtube_automator')
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
     logger.info(f"Received signal {signum}, shutting down...")
-    # Force termination of any potential child processes
-    os.killpg(os.getpgid(0), signal.SIGTERM)
+    # Stop our own media workers (and their ffmpeg children) rather than the whole process group
+    shutdown_media_pool()
     sys.exit(0)
 
 signal.signal(signal.SIGTERM, _shutdown)
 
 # --- Import Components ---
-from frame_prompt_extractor import RealExtractorClient, extract_prompts_from_frame
-from runway_video_generator import RealRunwayClient, generate_with_runway
-from youtube_uploader import RealYouTubeClient, upload_video
-from engagement_tracker import RealAnalyticsClient, fetch_metrics
-from shorts_generator import RealShortsClient, generate_short
-from linkedin_poster import RealLinkedInClient, post_video
-from comment_responder import RealCommentClient, respond_to_comment
+from frame_prompt_extractor import RealExtractorClient, MockExtractorClient, extract_prompts_from_frame
+from runway_video_generator import RealRunwayClient, MockRunwayClient, generate_with_runway
+from youtube_uploader import RealYouTubeClient, MockYouTubeClient, upload_video
+from engagement_tracker import RealAnalyticsClient, MockAnalyticsClient, fetch_metrics
+from shorts_generator import RealShortsClient, MockShortsClient, generate_short
+from linkedin_poster import RealLinkedInClient, MockLinkedInClient, post_video
+from comment_responder import RealCommentClient, MockCommentClient, respond_to_comment
+from media_analysis import RealAnalysisClient, MockAnalysisClient
+from thumbnail_uploader import RealThumbnailClient, MockThumbnailClient, upload_best_thumbnail
+from artifact_store import ArtifactStore, get_artifact_store
+from stage_scheduler import StageScheduler, WorkItem, get_scheduler, parse_deadline
+from pipeline_metrics import trace, span, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
 
 # --- Automator Protocol for Mocking ---
 class Automator(Protocol):
@@ -39,42 +43,121 @@ class Automator(Protocol):
         ...
 
 class RealYouTubeAutomator:
-    def __init__(self):
+    def __init__(self, extractor=None, runway=None, uploader=None, analytics=None,
+                 shorts=None, linkedin=None, commenter=None, analyzer=None, thumbnails=None,
+                 store: ArtifactStore = None, channel: str = '', scheduler: StageScheduler = None):
         load_dotenv()
         self.frame_path = os.getenv('FRAME_PATH')
-        self.video_id = os.getenv('VIDEO_ID')
-        self.comment_id = os.getenv('COMMENT_ID')
 
-        self.extractor = RealExtractorClient()
-        self.runway = RealRunwayClient()
-        self.uploader = RealYouTubeClient()
-        self.analytics = RealAnalyticsClient()
-        self.shorts = RealShortsClient()
-        self.linkedin = RealLinkedInClient()
-        self.commenter = RealCommentClient()
+        # Any client may be injected (e.g. mocks for benchmarking)
+        self.extractor = extractor or RealExtractorClient()
+        self.runway = runway or RealRunwayClient()
+        self.uploader = uploader or RealYouTubeClient()
+        self.analytics = analytics or RealAnalyticsClient()
+        self.shorts = shorts or RealShortsClient()
+        self.linkedin = linkedin or RealLinkedInClient()
+        self.commenter = commenter or RealCommentClient()
+        self.analyzer = analyzer or RealAnalysisClient()
+        self.thumbnails = thumbnails or RealThumbnailClient()
+        self.store = store or get_artifact_store()
+        # Upload de-duplication is per channel: the same render may go to several channels
+        self.channel = channel
+        # Shared per process so every automator's items compete for the same stage slots
+        self.scheduler = scheduler or get_scheduler()
 
     def run(self) -> None:
         if not self.frame_path:
             logger.error("FRAME_PATH not set")
             sys.exit(1)
-        prompts = extract_prompts_from_frame(self.extractor, self.frame_path)
+        # Renders live in the artifact store; OUTPUT_VIDEO_PATH additionally links one out
+        self.process(self.frame_path, os.getenv('OUTPUT_VIDEO_PATH'),
+                     priority=int(os.getenv('ITEM_PRIORITY', '0')),
+                     deadline=parse_deadline(os.getenv('PUBLISH_DEADLINE')),
+                     video_id=os.getenv('VIDEO_ID'), comment_id=os.getenv('COMMENT_ID'),
+                     comment_text=os.getenv('COMMENT_TEXT'))
+
+    def process(self, frame_path: str, video_path: str = None, trace_id: str = None,
+                title: str = None, description: str = None, priority: int = 0,
+                deadline: float = None, video_id: str = None, comment_id: str = None,
+                comment_text: str = None) -> dict:
+        # video_id / comment_id belong to the job, not the process: the daemon and runner
+        # share one automator across many jobs
+        with trace(trace_id) as item_trace, span('pipeline', frame_path=frame_path), log_context(item=frame_path):
+            item = WorkItem(item_trace, self.channel, priority, deadline)
+            # Trace IDs can come from job files, so they are not unique; references are per run
+            owner = f'{item_trace}:{uuid.uuid4().hex[:8]}'
+            try:
+                with self.scheduler.tracking(item):
+                    return self._process(item, owner, frame_path, video_path, title, description,
+                                         video_id, comment_id, comment_text)
+            finally:
+                # The job's artifacts stay cached but become eligible for eviction
+                self.store.release(owner)
+
+    def _process(self, item: WorkItem, owner: str, frame_path: str, video_path: str, title: str,
+                 description: str, video_id: str, comment_id: str, comment_text: str) -> dict:
+        item_trace = item.id
+        logger.info(f"Processing '{frame_path}' (trace {item_trace})")
+        prompts = extract_prompts_from_frame(self.extractor, frame_path)
         prompt = prompts[0] if prompts else ""
-        video_bytes = asyncio.run(generate_with_runway(self.runway, prompt))
-        video_path = os.getenv('OUTPUT_VIDEO_PATH', 'output_video.mp4')
-        with open(video_path, 'wb') as f:
-            f.write(video_bytes)
-        title = os.getenv('VIDEO_TITLE', 'Generated Video')
-        desc = os.getenv('VIDEO_DESC', '')
-        upload_video(self.uploader, video_path, title, desc)
-        if self.video_id:
-            metrics = fetch_metrics(self.analytics, self.video_id)
+        with self.scheduler.slot('runway', item):
+            video_bytes = asyncio.run(generate_with_runway(self.runway, prompt))
+        with span('write'):
+            video = self.store.put_bytes(video_bytes, '.mp4', job_id=owner, role='video')
+            if video_path:
+                self.store.export(video.digest, video_path)
+        # Single decode pass; shorts and thumbnails read the sidecar it writes
+        with self.scheduler.slot('analysis', item):
+            analysis = self.analyzer.analyze(video.path)
+        self.store.record_sidecar(video.digest)
+        title = title or os.getenv('VIDEO_TITLE', 'Generated Video')
+        desc = description if description is not None else os.getenv('VIDEO_DESC', '')
+        uploaded_id = self.store.find_upload(video.digest, self.channel)
+        if uploaded_id:
+            logger.info(f"Render {video.digest[:12]} was already uploaded as {uploaded_id}; skipping upload")
+            item.mark_done('upload')
+        else:
+            with self.scheduler.slot('upload', item):
+                uploaded_id = upload_video(self.uploader, video.path, title, desc)
+                if uploaded_id:
+                    self.store.record_upload(video.digest, uploaded_id, self.channel)
+        if uploaded_id:
+            self._set_thumbnail(video, uploaded_id, analysis)
+        if video_id:
+            metrics = fetch_metrics(self.analytics, video_id)
             logger.info(f"Metrics: {metrics}")
         short_len = int(os.getenv('SHORT_LENGTH', '15'))
-        short_path = generate_short(self.shorts, video_path, short_len)
+        with self.scheduler.slot('encode', item):
+            short_path = generate_short(self.shorts, video.path, short_len, self.store.scratch_path('.mp4'))
+        if short_path and os.path.exists(short_path):
+            short_path = self.store.put(short_path, job_id=owner, role='short').path
         post_video(self.linkedin, short_path)
-        if self.comment_id:
-            text = os.getenv('COMMENT_TEXT', 'Thanks for watching!')
-            respond_to_comment(self.commenter, self.comment_id, text)
+        if comment_id:
+            respond_to_comment(self.commenter, comment_id, comment_text or 'Thanks for watching!')
+        return {'trace_id': item_trace, 'video_id': uploaded_id, 'video_path': video.path,
+                'video_digest': video.digest, 'short_path': short_path}
+
+    def _set_thumbnail(self, video, uploaded_id: str, analysis: dict) -> None:
+        # Recorded like an upload so a retried job sets a thumbnail that failed last time
+        scope = f'{self.channel}#thumbnail'
+        if self.store.find_upload(video.digest, scope):
+            return
+        try:
+            if upload_best_thumbnail(self.thumbnails, uploaded_id, video.path, analysis):
+                self.store.record_upload(video.digest, uploaded_id, scope)
+        except Exception as e:
+            # The video is already published; a missing custom thumbnail must not fail the job
+            logger.warning(f"Could not set thumbnail for {uploaded_id}: {type(e).__name__}: {e}")
+
+def build_mock_clients() -> dict:
+    """Mock clients keyed by RealYouTubeAutomator's constructor arguments."""
+    return {
+        'extractor': MockExtractorClient(), 'runway': MockRunwayClient(),
+        'uploader': MockYouTubeClient(), 'analytics': MockAnalyticsClient(),
+        'shorts': MockShortsClient(), 'linkedin': MockLinkedInClient(),
+        'commenter': MockCommentClient(), 'analyzer': MockAnalysisClient(),
+        'thumbnails': MockThumbnailClient(),
+    }
 
 class MockYouTubeAutomator:
     def __init__(self):
@@ -86,14 +169,17 @@ class MockYouTubeAutomator:
 def main():
     parser = argparse.ArgumentParser(description="YouTube Automator with Mock Support")
     parser.add_argument('--mock', action='store_true', help='Use mock Automator')
+    add_profile_argument(parser)
     args = parser.parse_args()
+    configure_from_env()
 
     automator = MockYouTubeAutomator() if args.mock else RealYouTubeAutomator()
-    try:
-        automator.run()
-    except Exception:
-        logger.exception("Error in youtube_automator")
-        sys.exit(1)
+    with profile_session(args.profile, 'youtube_automator'):
+        try:
+            automator.run()
+        except Exception:
+            logger.exception("Error in youtube_automator")
+            sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
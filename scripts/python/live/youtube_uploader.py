@@ -2,24 +2,20 @@
 import os
 import sys
 import signal
-import logging
 import argparse
 from dotenv import load_dotenv
 from typing import Protocol
 from google_auth_utils import get_authenticated_service
 from googleapiclient.http import MediaFileUpload
+from pipeline_metrics import instrumented, record_bytes, file_size, configure_from_env
+from pipeline_profiler import add_profile_argument, profile_session
+from resilient_http import get_http_client
+from pipeline_logging import get_logger
 
-def setup_logging():
-    logger = logging.getLogger('youtube_uploader')
-    logger.setLevel(logging.INFO)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(
-        '[%(asctime)s] [%(process)d] %(levelname)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'))
-    logger.addHandler(handler)
-    return logger
+GOOGLE_API_HOST = 'www.googleapis.com'
+NUM_RETRIES = int(os.getenv('GOOGLE_API_NUM_RETRIES', '5'))
 
-logger = setup_logging()
+logger = get_logger('youtube_uploader')
 
 def handle_signal(signum, frame):
     logger.info(f"Received signal {signum}, exiting.")
@@ -33,16 +29,18 @@ class YouTubeClient(Protocol):
         ...
 
 class RealYouTubeClient:
-    def __init__(self):
+    def __init__(self, token_dir: str = None, client_secrets_file: str = None):
         load_dotenv()
         # YouTube upload requires OAuth with specific scopes
         SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
         try:
-            self.youtube = get_authenticated_service('youtube', 'v3', SCOPES)
+            self.youtube = get_authenticated_service('youtube', 'v3', SCOPES,
+                                                     token_dir, client_secrets_file)
         except Exception as e:
             logger.error(f"Failed to authenticate with YouTube API: {e}")
             sys.exit(1)
 
+    @instrumented('upload')
     def upload(self, video_path: str, title: str, description: str) -> str:
         if not os.path.exists(video_path):
             logger.error(f"Video file not found: {video_path}")
@@ -59,10 +57,14 @@ class RealYouTubeClient:
             )
             response = None
             while response is None:
-                status, response = request.next_chunk()
+                # googleapiclient retries 5xx/429 itself; we add pacing and circuit breaking
+                with get_http_client().guarded(GOOGLE_API_HOST):
+                    status, response = request.next_chunk(num_retries=NUM_RETRIES)
                 if status:
-                    logger.info(f"Upload progress: {int(status.progress() * 100)}%")
+                    logger.debug(f"Upload progress: {int(status.progress() * 100)}%",
+                                 extra={'sample': 'upload_progress'})
             video_id = response.get('id')
+            record_bytes('upload', 'out', file_size(video_path))
             logger.info(f"Video uploaded successfully with ID: {video_id}")
             return video_id
         except Exception:
@@ -86,16 +88,19 @@ def parse_args():
     parser.add_argument('-t', '--title', required=True, help='Video title')
     parser.add_argument('-d', '--desc', default='', help='Video description')
     parser.add_argument('--mock', action='store_true', help='Use mock YouTube client')
+    add_profile_argument(parser)
     return parser.parse_args()
 
 def main():
     args = parse_args()
+    configure_from_env()
     client = MockYouTubeClient() if args.mock else RealYouTubeClient()
-    try:
-        video_id = upload_video(client, args.path, args.title, args.desc)
-        logger.info(f"Video ID: {video_id}")
-    except Exception:
-        sys.exit(1)
+    with profile_session(args.profile, 'youtube_uploader'):
+        try:
+            video_id = upload_video(client, args.path, args.title, args.desc)
+            logger.info(f"Video ID: {video_id}")
+        except Exception:
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
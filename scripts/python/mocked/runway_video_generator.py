@@ -15,7 +15,7 @@ logger.addHandler(handler)
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
-    logger.info(f'Received signal {{signum}}, shutting down...')
+    logger.info(f'Received signal {signum}, shutting down...')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, _shutdown)
@@ -32,7 +32,7 @@ class RealRunwayClient:
         pass
 
     async def generate(self, prompt: str) -> bytes:
-        logger.info(f"[REAL] Generating video for prompt '{{prompt}}'")
+        logger.info(f"[REAL] Generating video for prompt '{prompt}'")
         # TODO: perform async API call
         return b''
 
@@ -41,7 +41,7 @@ class MockRunwayClient:
         logger.info("Initializing MockRunwayClient")
 
     async def generate(self, prompt: str) -> bytes:
-        logger.info(f"[MOCK] Pretending to generate video for prompt '{{prompt}}'")
+        logger.info(f"[MOCK] Pretending to generate video for prompt '{prompt}'")
         return b'mock_video_bytes'
 
 # --- Core Functionality ---
@@ -14,7 +14,7 @@ logger.addHandler(handler)
 
 # --- Shutdown Handling ---
 def _shutdown(signum, frame):
-    logger.info(f'Received signal {{signum}}, shutting down...')
+    logger.info(f'Received signal {signum}, shutting down...')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, _shutdown)